@@ -2,6 +2,9 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to ``/api/stream/`` are answered by the Server-Sent Events endpoint
+in ``core.sse``; everything else goes to Django. Serving processes also warm
+the API response cache (``core.warming``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core import warming  # noqa: E402  (needs the app registry)
+from core.sse import EventStreamRouter  # noqa: E402
+
+warming.start()
+
+application = EventStreamRouter(django_application, path='/api/stream/')
@@ -69,6 +69,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReferenceDataMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,8 +81,8 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -91,8 +93,74 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.SharedTokenBucketThrottle',
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For (API_NUM_PROXIES,
+    # 1 for nginx in production). Throttling keys on the address the outermost
+    # of them saw, so clients behind them keep their own buckets; set 0 when the
+    # app is reached directly, as any client can send X-Forwarded-For.
+    'NUM_PROXIES': int(os.environ.get('API_NUM_PROXIES', '1')),
+    # Per-endpoint budgets, per client IP; scopes are set on the viewsets.
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '600/min',
+        'months': '240/min',
+        'heroes': '240/min',
+        'mentors': '240/min',
+        'directions': '240/min',
+        'news': '240/min',
+        'stats': '240/min',
+    },
 }
 
+# The browsable API renders full HTML templates; only offer it while developing.
+if DEBUG:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'rest_framework.renderers.BrowsableAPIRenderer'
+    )
+
+# Live update events streamed at /api/stream/ (core.events, core.sse).
+# LocalBackend only reaches streams served by the publishing process; with
+# several workers use the file backend, e.g.
+#   EVENTS_BACKEND = 'core.events.FileBackend'
+#   EVENTS_BACKEND_OPTIONS = {'path': BASE_DIR / 'var' / 'events.log'}
+EVENTS_BACKEND = 'core.events.LocalBackend'
+EVENTS_BACKEND_OPTIONS = {}
+EVENTS_MAX_SUBSCRIBERS = 5000
+EVENTS_QUEUE_SIZE = 64
+# Events kept for Last-Event-ID resume; clients further behind (or more than
+# half a queue behind) get one "resync" event instead.
+EVENTS_HISTORY_SIZE = 256
+EVENTS_HEARTBEAT_SECONDS = 15
+
+# Static pre-rendering of the API (manage.py prerender_api, core.prerender).
+PRERENDER_ROOT = BASE_DIR / 'var' / 'prerendered'
+PRERENDER_BASE_URL = 'https://api.pdpjunior.uz'
+PRERENDER_ON_SAVE = False
+PRERENDER_DEBOUNCE_SECONDS = 5
+
+# Shared token-bucket store for core.throttling.SharedTokenBucketThrottle.
+THROTTLE_STORE_PATH = BASE_DIR / 'var' / 'throttle.sqlite3'
+
+# Maximum number of objects a ``?ids=`` batch request may fetch.
+API_BATCH_IDS_MAX = 50
+
+# Children embedded in a month or direction (heroes, mentors); the rest are
+# reached through the ``heroes_url``/``mentors_url`` links.
+API_NESTED_LIMIT = 20
+
+# /api/batch/ (core.batch): paths per request, and the response size after
+# which the remaining paths are answered with 413 instead of being run.
+API_BATCH_PATHS_MAX = 20
+API_BATCH_MAX_BYTES = 2 * 1024 * 1024
+
+# Rows read and serialized per chunk by the NDJSON exports (core.export).
+API_EXPORT_CHUNK_SIZE = 1000
+
+# Delta sync (?since=): tokens are set back by this many seconds so rows
+# committed late by concurrent transactions are not missed.
+SYNC_TOKEN_MARGIN_SECONDS = 5
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -123,6 +191,78 @@ DATABASES = {
 }
 
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Directory for the version stamp files that invalidate process-local caches
+# across workers (core.cache.VersionStamp).
+CACHE_STAMP_DIR = BASE_DIR / 'var' / 'stamps'
+
+# Cached list responses with single-flight recomputation (core.cache.single_flight).
+# The lock only coalesces across processes if this alias is a shared backend
+# (Redis, Memcached, database); LocMemCache coalesces within a worker.
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60 * 60
+API_CACHE_LOCK_TIMEOUT = 30
+API_CACHE_WAIT = 2.0
+
+# Serialized objects reused across list responses (core.fragments).
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Background cache warming in serving processes (core.warming).
+# WARM_BASE_URL must match the scheme and host of live requests. warm_cache and
+# the job worker can only warm a shared API_CACHE_ALIAS; with LocMemCache they
+# skip it.
+WARM_ENABLED = True
+WARM_BASE_URL = PRERENDER_BASE_URL
+WARM_PAGES = 3
+WARM_MAX_DETAILS = 100
+WARM_CONCURRENCY = 2
+WARM_DEBOUNCE_SECONDS = 2
+
+# Background jobs (core.jobs), run by `manage.py run_worker`.
+JOB_WORKER_PROCESSES = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_VISIBILITY_TIMEOUT = 5 * 60
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+# Directory in the default storage for files written by export jobs.
+JOB_EXPORT_DIR = 'exports'
+
+# Hot/archive split (core.archive, manage.py archive_history): news older than
+# this many days, and heroes of months inactive and created more than this many
+# days ago, move to the archive tables.
+ARCHIVE_NEWS_AFTER_DAYS = 365
+ARCHIVE_CLOSED_MONTH_AFTER_DAYS = 60
+
+# Admin changelists over large tables (core.changelist)
+ADMIN_COUNT_CAP = 1000
+ADMIN_ROLLUP_SECONDS = 5 * 60
+
+# Response compression (core.middleware.CompressionMiddleware)
+COMPRESSION_PATH_PREFIXES = ('/api/',)
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_CACHE_ALIAS = 'default'
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+COMPRESSION_BROTLI_QUALITY = 9
+COMPRESSION_GZIP_LEVEL = 6
+
+# Edge cache headers and purging (core.cdn)
+CDN_BROWSER_MAX_AGE = 60
+CDN_EDGE_MAX_AGE = 60 * 60 * 24
+CDN_SURROGATE_KEY_HEADER = 'Surrogate-Key'
+CDN_SURROGATE_KEY_MAX_LENGTH = 16 * 1024
+CDN_PURGER = 'core.cdn.NullPurger'
+CDN_PURGER_OPTIONS = {}
+# e.g. CDN_PURGER = 'core.cdn.HTTPPurger'
+#      CDN_PURGER_OPTIONS = {'url': 'https://edge.example/purge', 'headers': {'Fastly-Key': '...'}}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,11 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Count, Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.shortcuts import redirect
 from django.urls import reverse
-from django.contrib.auth.models import User, Group
+from django.contrib.auth.models import User, Group, Permission
 from unfold.admin import ModelAdmin, TabularInline, StackedInline
-from unfold.decorators import display
+from unfold.decorators import action, display
 from unfold.contrib.filters.admin import (
     RangeDateFilter,
     RangeDateTimeFilter,
@@ -13,12 +16,47 @@ from unfold.contrib.filters.admin import (
     SingleNumericFilter,
     SliderNumericFilter,
     MultipleChoicesDropdownFilter,
+    RelatedDropdownFilter,
 )
 from unfold.contrib.forms.widgets import WysiwygWidget
 from import_export.admin import ImportExportModelAdmin
 from django import forms
 
-from .models import Month, MonthHero, Mentor, Direction, News
+from . import archive, jobs, tasks
+from .changelist import ScalableChangeListMixin
+from .models import ArchivedMonthHero, ArchivedNews, Month, MonthHero, Mentor, Direction, News, Job
+from .refdata import TABLES, directions, months
+from .search import AUTOCOMPLETE_LIMIT, search_users
+
+
+# ============================================================================
+# LIST FILTERS
+# ============================================================================
+
+class ReferenceDropdownFilter(RelatedDropdownFilter):
+    """Related-object dropdown whose choices come from core.refdata, not a query"""
+
+    def field_choices(self, field, request, model_admin):
+        return [(obj.pk, str(obj)) for obj in TABLES[field.related_model].all()]
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def message_job_queued(modeladmin, request, job, text):
+    """Tell the user ``job`` was queued, linking to its progress page."""
+    url = reverse('admin:core_job_change', args=[job.pk])
+    modeladmin.message_user(request, format_html('{} <a href="{}">Job #{}</a>', text, url, job.pk))
+
+
+@admin.action(description=_("Export selected in background (CSV)"))
+def export_in_background(modeladmin, request, queryset):
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    job = jobs.enqueue(
+        tasks.export_objects, user=request.user, model=queryset.model._meta.label, pks=pks,
+    )
+    message_job_queued(modeladmin, request, job, f"Exporting {len(pks)} rows in the background.")
 
 
 # ============================================================================
@@ -123,7 +161,7 @@ class MonthAdmin(ImportExportModelAdmin, ModelAdmin):
 
     readonly_fields = ['created_at']
 
-    actions = ['activate_months', 'deactivate_months']
+    actions = ['activate_months', 'deactivate_months', export_in_background]
 
     # Custom display methods
     @display(description=_("Status"), label=True)
@@ -132,7 +170,7 @@ class MonthAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Total Heroes"), ordering="hero_count")
     def hero_count(self, obj):
-        count = obj.heroes.count()
+        count = obj.hero_count
         if count > 0:
             url = reverse('admin:core_monthhero_changelist') + f'?month__id__exact={obj.id}'
             return format_html('<a href="{}">{} Heroes</a>', url, count)
@@ -140,12 +178,12 @@ class MonthAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Students"), ordering="student_count")
     def student_hero_count(self, obj):
-        count = obj.heroes.filter(type='student').count()
+        count = obj.student_count
         return format_html('<span style="color: #10b981;">{}</span>', count)
 
     @display(description=_("Teachers"), ordering="teacher_count")
     def teacher_hero_count(self, obj):
-        count = obj.heroes.filter(type='teacher').count()
+        count = obj.teacher_count
         return format_html('<span style="color: #3b82f6;">{}</span>', count)
 
     @display(description=_("Created"), ordering="created_at")
@@ -173,7 +211,7 @@ class MonthAdmin(ImportExportModelAdmin, ModelAdmin):
         self.message_user(request, f"{updated} months deactivated successfully.")
 
 @admin.register(MonthHero)
-class MonthHeroAdmin(ImportExportModelAdmin, ModelAdmin):
+class MonthHeroAdmin(ScalableChangeListMixin, ImportExportModelAdmin, ModelAdmin):
     """Advanced admin for MonthHero model"""
     list_display = [
         'image_thumbnail',
@@ -186,7 +224,7 @@ class MonthHeroAdmin(ImportExportModelAdmin, ModelAdmin):
     list_filter = [
         ('type', MultipleChoicesDropdownFilter),
         'is_active',
-        'month',
+        ('month', ReferenceDropdownFilter),
         ('created_at', RangeDateTimeFilter),
     ]
     list_filter_submit = True
@@ -201,6 +239,7 @@ class MonthHeroAdmin(ImportExportModelAdmin, ModelAdmin):
     ordering = ['-created_at']
     date_hierarchy = 'created_at'
     autocomplete_fields = ['user', 'month']
+    list_select_related = ['user']
 
     fieldsets = (
         (_('Hero Information'), {
@@ -223,7 +262,7 @@ class MonthHeroAdmin(ImportExportModelAdmin, ModelAdmin):
 
     readonly_fields = ['image_preview', 'created_at']
 
-    actions = ['activate_heroes', 'deactivate_heroes', 'change_to_student', 'change_to_teacher']
+    actions = ['activate_heroes', 'deactivate_heroes', 'change_to_student', 'change_to_teacher', export_in_background]
 
     # Custom display methods
     @display(description=_("Image"))
@@ -243,8 +282,9 @@ class MonthHeroAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Month"), ordering="month__name")
     def month_info(self, obj):
-        url = reverse('admin:core_month_change', args=[obj.month.id])
-        return format_html('<a href="{}">{}</a>', url, obj.month.name)
+        month = months.get(obj.month_id)
+        url = reverse('admin:core_month_change', args=[obj.month_id])
+        return format_html('<a href="{}">{}</a>', url, month.name if month else obj.month_id)
 
     @display(description=_("Type"), label=True)
     def type_badge(self, obj):
@@ -324,7 +364,7 @@ class DirectionAdmin(ImportExportModelAdmin, ModelAdmin):
     )
 
     readonly_fields = ['created_at']
-    actions = ['activate_directions', 'deactivate_directions']
+    actions = ['activate_directions', 'deactivate_directions', export_in_background]
 
     @display(description=_("Status"), label=True)
     def is_active_badge(self, obj):
@@ -332,7 +372,7 @@ class DirectionAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Total Mentors"), ordering="total_mentors")
     def mentor_count(self, obj):
-        count = obj.mentors.count()
+        count = obj.total_mentors
         if count > 0:
             url = reverse('admin:core_mentor_changelist') + f'?direction__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
@@ -340,7 +380,7 @@ class DirectionAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Active Mentors"), ordering="active_mentors")
     def active_mentor_count(self, obj):
-        count = obj.mentors.filter(is_active=True).count()
+        count = obj.active_mentors
         return format_html('<span style="color: #10b981;">{}</span>', count)
 
     @display(description=_("Created"), ordering="created_at")
@@ -377,7 +417,7 @@ class MentorAdmin(ImportExportModelAdmin, ModelAdmin):
     ]
     list_filter = [
         'is_active',
-        'direction',
+        ('direction', ReferenceDropdownFilter),
         ('created_at', RangeDateTimeFilter),
     ]
     list_filter_submit = True
@@ -406,7 +446,7 @@ class MentorAdmin(ImportExportModelAdmin, ModelAdmin):
     )
 
     readonly_fields = ['image_preview', 'created_at']
-    actions = ['activate_mentors', 'deactivate_mentors']
+    actions = ['activate_mentors', 'deactivate_mentors', export_in_background]
 
     @display(description=_("Photo"))
     def image_thumbnail(self, obj):
@@ -419,9 +459,10 @@ class MentorAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Direction"), ordering="direction__title")
     def direction_info(self, obj):
-        if obj.direction:
-            url = reverse('admin:core_direction_change', args=[obj.direction.id])
-            return format_html('<a href="{}">{}</a>', url, obj.direction.title)
+        direction = directions.get(obj.direction_id)
+        if direction:
+            url = reverse('admin:core_direction_change', args=[direction.id])
+            return format_html('<a href="{}">{}</a>', url, direction.title)
         return format_html('<span style="color: #9ca3af;">No direction</span>')
 
     @display(description=_("Status"), label=True)
@@ -452,7 +493,7 @@ class MentorAdmin(ImportExportModelAdmin, ModelAdmin):
         self.message_user(request, f"{updated} mentors deactivated.")
 
 @admin.register(News)
-class NewsAdmin(ImportExportModelAdmin, ModelAdmin):
+class NewsAdmin(ScalableChangeListMixin, ImportExportModelAdmin, ModelAdmin):
     """Advanced admin for News model"""
     form = NewsAdminForm
     list_display = [
@@ -485,13 +526,13 @@ class NewsAdmin(ImportExportModelAdmin, ModelAdmin):
             'classes': ['tab'],
         }),
         (_('Metadata'), {
-            'fields': ('created_at',),
+            'fields': ('created_at', 'word_count'),
             'classes': ['tab'],
         }),
     )
 
-    readonly_fields = ['image_preview', 'created_at']
-    actions = ['activate_news', 'deactivate_news', 'duplicate_news']
+    readonly_fields = ['image_preview', 'created_at', 'word_count']
+    actions = ['activate_news', 'deactivate_news', 'duplicate_news', export_in_background]
 
     @display(description=_("Image"))
     def image_thumbnail(self, obj):
@@ -508,7 +549,7 @@ class NewsAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @display(description=_("Preview"))
     def content_preview(self, obj):
-        preview = obj.content[:80] + '...' if len(obj.content) > 80 else obj.content
+        preview = obj.excerpt[:80] + '...' if len(obj.excerpt) > 80 else obj.excerpt
         return format_html('<span style="color: #6b7280;">{}</span>', preview)
 
     @display(description=_("Status"), label=True)
@@ -540,11 +581,60 @@ class NewsAdmin(ImportExportModelAdmin, ModelAdmin):
 
     @admin.action(description=_("Duplicate selected news"))
     def duplicate_news(self, request, queryset):
-        for news in queryset:
-            news.pk = None
-            news.title = f"{news.title} (Copy)"
-            news.save()
-        self.message_user(request, f"{queryset.count()} news articles duplicated.")
+        pks = list(queryset.values_list('pk', flat=True))
+        job = jobs.enqueue(tasks.duplicate_news, user=request.user, pks=pks)
+        message_job_queued(self, request, job, f"Duplicating {len(pks)} news articles in the background.")
+
+
+# ============================================================================
+# ARCHIVE ADMINS
+# ============================================================================
+
+@admin.action(description=_("Restore selected from the archive"))
+def restore_from_archive(modeladmin, request, queryset):
+    try:
+        # All or nothing: archive.restore commits batch by batch on its own.
+        with transaction.atomic():
+            restored = archive.restore(queryset)
+    except IntegrityError:
+        modeladmin.message_user(
+            request, _("A selected row conflicts with a live one; nothing was restored."), level=messages.ERROR,
+        )
+        return
+    modeladmin.message_user(request, f"{restored} rows restored.")
+
+
+class ArchiveAdmin(ScalableChangeListMixin, ModelAdmin):
+    """Archived rows (core.archive): hide, delete or restore; they are not created here."""
+    list_editable = ['is_active']
+    list_filter = [
+        'is_active',
+        ('created_at', RangeDateTimeFilter),
+    ]
+    list_filter_submit = True
+    ordering = ['-created_at']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['created_at', 'updated_at', 'archived_at']
+    actions = [restore_from_archive]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ArchivedNews)
+class ArchivedNewsAdmin(ArchiveAdmin):
+    list_display = ['title', 'is_active', 'created_at', 'archived_at']
+    search_fields = ['title']
+    readonly_fields = ArchiveAdmin.readonly_fields + ['word_count']
+
+
+@admin.register(ArchivedMonthHero)
+class ArchivedMonthHeroAdmin(ArchiveAdmin):
+    list_display = ['user', 'month', 'type', 'is_active', 'created_at', 'archived_at']
+    list_filter = [('month', ReferenceDropdownFilter), *ArchiveAdmin.list_filter]
+    search_fields = ['user__username', 'user__first_name', 'user__last_name']
+    list_select_related = ['user', 'month']
+    autocomplete_fields = ['user', 'month']
 
 
 # ============================================================================
@@ -552,7 +642,7 @@ class NewsAdmin(ImportExportModelAdmin, ModelAdmin):
 # ============================================================================
 admin.site.unregister(User)
 @admin.register(User)
-class CustomUserAdmin(ModelAdmin):
+class CustomUserAdmin(ScalableChangeListMixin, ModelAdmin):
     """Enhanced User admin with Unfold styling"""
     list_display = [
         'username',
@@ -611,7 +701,7 @@ class CustomUserAdmin(ModelAdmin):
 
     @display(description=_("Hero Awards"), ordering="hero_count")
     def hero_count(self, obj):
-        count = obj.month_heroes.count()
+        count = obj.hero_count or 0
         if count > 0:
             url = reverse('admin:core_monthhero_changelist') + f'?user__id__exact={obj.id}'
             return format_html('<a href="{}">{} 🏆</a>', url, count)
@@ -623,7 +713,25 @@ class CustomUserAdmin(ModelAdmin):
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.annotate(hero_count=Count('month_heroes'))
+        # A correlated subquery is only evaluated for the rows on the page;
+        # a joined Count() would group the whole user table first.
+        heroes = MonthHero.objects.filter(user=OuterRef('pk')).order_by().values('user')
+        return qs.annotate(hero_count=Subquery(heroes.annotate(count=Count('pk')).values('count')))
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed prefix/trigram lookup (core.search) instead of icontains
+        # scans; also serves the user autocomplete of the hero admins.
+        if not search_term.strip():
+            return queryset, False
+        autocomplete = request.resolver_match.url_name == 'autocomplete'
+        limit = AUTOCOMPLETE_LIMIT if autocomplete else None
+        return search_users(queryset, search_term, limit=limit), False
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'user_permissions':
+            # Permission.__str__ includes the content type.
+            kwargs['queryset'] = Permission.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 
 # ============================================================================
@@ -640,7 +748,7 @@ class CustomGroupAdmin(ModelAdmin):
 
     @display(description=_("Users"))
     def user_count(self, obj):
-        count = obj.user_set.count()
+        count = obj.user_count
         if count > 0:
             url = reverse('admin:auth_user_changelist') + f'?groups__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
@@ -648,11 +756,138 @@ class CustomGroupAdmin(ModelAdmin):
 
     @display(description=_("Permissions"))
     def permission_count(self, obj):
-        return obj.permissions.count()
+        return obj.permission_count
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         return qs.annotate(
-            user_count=Count('user'),
-            permission_count=Count('permissions')
-        )
\ No newline at end of file
+            user_count=Count('user', distinct=True),
+            permission_count=Count('permissions', distinct=True)
+        )
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'permissions':
+            # Permission.__str__ includes the content type.
+            kwargs['queryset'] = Permission.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+
+# ============================================================================
+# JOB ADMIN
+# ============================================================================
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    """Progress and outcome of background jobs; read-only apart from retry/cancel"""
+    list_display = [
+        'id',
+        'task',
+        'status_badge',
+        'progress_display',
+        'attempts_display',
+        'created_by',
+        'created_at_formatted',
+        'finished_at_formatted',
+    ]
+    list_display_links = ['id', 'task']
+    list_filter = ['status', 'task']
+    list_select_related = ['created_by']
+    search_fields = ['task']
+    ordering = ['-created_at']
+    actions = ['retry_jobs', 'cancel_jobs']
+    actions_list = ['queue_search_rebuild', 'queue_cache_warm', 'queue_prerender']
+
+    fieldsets = (
+        (_('Job'), {
+            'fields': ('task', 'args', 'status', 'progress_display', 'message', 'result_display'),
+            'classes': ['tab'],
+        }),
+        (_('Execution'), {
+            'fields': (
+                'attempts', 'max_attempts', 'worker', 'run_after', 'locked_until',
+                'created_by', 'created_at', 'started_at', 'finished_at',
+            ),
+            'classes': ['tab'],
+        }),
+        (_('Error'), {
+            'fields': ('error',),
+            'classes': ['tab'],
+        }),
+    )
+
+    readonly_fields = [
+        'task', 'args', 'status', 'progress_display', 'message', 'result_display',
+        'attempts', 'max_attempts', 'worker', 'run_after', 'locked_until',
+        'created_by', 'created_at', 'started_at', 'finished_at', 'error',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    @display(description=_("Status"), ordering="status", label={
+        'Queued': 'info', 'Running': 'warning', 'Done': 'success', 'Failed': 'danger', 'Cancelled': 'info',
+    })
+    def status_badge(self, obj):
+        return obj.get_status_display()
+
+    @display(description=_("Progress"))
+    def progress_display(self, obj):
+        if not obj.total:
+            return obj.progress or '-'
+        percent = min(100, obj.progress * 100 // obj.total)
+        return format_html(
+            '<div style="width: 120px; background: #e5e7eb; border-radius: 4px;">'
+            '<div style="width: {}%; background: #10b981; height: 6px; border-radius: 4px;"></div></div>'
+            '<span style="color: #6b7280;">{} / {}</span>',
+            percent, obj.progress, obj.total,
+        )
+
+    @display(description=_("Attempts"), ordering="attempts")
+    def attempts_display(self, obj):
+        return f"{obj.attempts} / {obj.max_attempts}"
+
+    @display(description=_("Result"))
+    def result_display(self, obj):
+        if obj.result and obj.result.get('file'):
+            return format_html('<a href="{}">{}</a>', obj.result['file'], _("Download"))
+        return obj.result
+
+    @display(description=_("Created"), ordering="created_at")
+    def created_at_formatted(self, obj):
+        return obj.created_at.strftime("%b %d, %Y %H:%M")
+
+    @display(description=_("Finished"), ordering="finished_at")
+    def finished_at_formatted(self, obj):
+        return obj.finished_at.strftime("%b %d, %Y %H:%M") if obj.finished_at else '-'
+
+    @admin.action(description=_("Retry selected jobs"))
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status__in=[Job.FAILED, Job.CANCELLED]).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), error='', finished_at=None,
+        )
+        self.message_user(request, f"{updated} jobs queued again.")
+
+    @admin.action(description=_("Cancel selected jobs"))
+    def cancel_jobs(self, request, queryset):
+        # Running jobs stop at their next progress report.
+        updated = queryset.filter(status__in=[Job.QUEUED, Job.RUNNING]).update(
+            status=Job.CANCELLED, locked_until=None, finished_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} jobs cancelled.")
+
+    def queue_task(self, request, func, text):
+        job = jobs.enqueue(func, user=request.user)
+        message_job_queued(self, request, job, text)
+        return redirect('admin:core_job_changelist')
+
+    @action(description=_("Rebuild user search index"), url_path="rebuild-search")
+    def queue_search_rebuild(self, request):
+        return self.queue_task(request, tasks.rebuild_user_search, "User search index rebuild queued.")
+
+    @action(description=_("Warm API cache"), url_path="warm-cache")
+    def queue_cache_warm(self, request):
+        return self.queue_task(request, tasks.warm_api_cache, "API cache warm-up queued.")
+
+    @action(description=_("Rebuild pre-rendered API"), url_path="prerender")
+    def queue_prerender(self, request):
+        return self.queue_task(request, tasks.prerender_api, "Pre-rendered API rebuild queued.")
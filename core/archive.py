@@ -0,0 +1,97 @@
+"""
+Hot/archive split for history that is no longer listed by default.
+
+News older than ``ARCHIVE_NEWS_AFTER_DAYS`` and the heroes of closed months
+(inactive and created more than ``ARCHIVE_CLOSED_MONTH_AFTER_DAYS`` ago) are
+moved to ``ArchivedNews``/``ArchivedMonthHero``. These tables have the same
+columns and keep the original ids. Rows are moved in batches, each in one
+transaction. The live rows are deleted through the ORM, so the usual
+receivers purge caches, record tombstones for delta sync and publish events.
+
+The public viewsets still serve archived objects by id and list them with
+``?archive=1`` (``ReadOnlyViewSet.archive_queryset``).
+``manage.py archive_history`` runs the move, e.g. nightly from cron, and
+``restore`` (the admin's "Restore" action) moves rows back.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .cache import model_stamp
+from .models import ArchivedMonthHero, ArchivedNews, Month, MonthHero, News
+
+ARCHIVES = {News: ArchivedNews, MonthHero: ArchivedMonthHero}
+LIVE = {archive_model: model for model, archive_model in ARCHIVES.items()}
+
+
+def archivable_news():
+    cutoff = timezone.now() - timedelta(days=settings.ARCHIVE_NEWS_AFTER_DAYS)
+    return News._base_manager.filter(created_at__lt=cutoff)
+
+
+def closed_months():
+    cutoff = timezone.now() - timedelta(days=settings.ARCHIVE_CLOSED_MONTH_AFTER_DAYS)
+    return Month._base_manager.filter(is_active=False, created_at__lt=cutoff)
+
+
+def archivable_heroes():
+    return MonthHero._base_manager.filter(month__in=closed_months())
+
+
+def move(queryset, batch_size=500):
+    """Move the rows of ``queryset`` to the archive of its model; return how many were moved."""
+    model = queryset.model
+    archive_model = ARCHIVES[model]
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk')[:batch_size])
+            if not rows:
+                return moved
+            archive_model._base_manager.bulk_create(
+                archive_model(**{name: getattr(row, name) for name in attnames}) for row in rows
+            )
+            model._base_manager.filter(pk__in=[row.pk for row in rows]).delete()
+            model_stamp(archive_model).bump_on_commit()
+        moved += len(rows)
+
+
+def restore(queryset, batch_size=500):
+    """Move the archived rows of ``queryset`` back to the live model; return how many were restored.
+
+    The live model sets ``created_at`` on insert, so the original value is
+    written back afterwards. The restored rows are then touched through
+    ``TrackedQuerySet.update`` so the receivers purge caches and delta sync
+    lists them again; deleting the archived rows purges the archive side.
+    """
+    archive_model = queryset.model
+    model = LIVE[archive_model]
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    restored = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk')[:batch_size])
+            if not rows:
+                return restored
+            pks = [row.pk for row in rows]
+            model._base_manager.bulk_create(
+                model(**{name: getattr(row, name) for name in attnames}) for row in rows
+            )
+            model._base_manager.filter(pk__in=pks).update(
+                created_at=Case(*(When(pk=row.pk, then=Value(row.created_at)) for row in rows)),
+            )
+            archive_model._base_manager.filter(pk__in=pks).delete()
+            model.objects.filter(pk__in=pks).update()
+        restored += len(rows)
+
+
+def archive_history(batch_size=500):
+    """Archive old news and closed months' heroes; return the rows moved per kind."""
+    return {
+        'news': move(archivable_news(), batch_size),
+        'heroes': move(archivable_heroes(), batch_size),
+    }
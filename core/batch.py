@@ -0,0 +1,104 @@
+"""
+Several API GETs answered by one request (``/api/batch/``).
+
+Each ``?path=`` is resolved and its view called in-process, on the same
+thread. The sub-requests therefore share the request's database connection
+and its reference-data check (``core.refdata``), and they hit the same
+response caches as direct requests. They carry the client's address, so
+every path still counts against its endpoint's throttle.
+
+The batch is edge-cached only while every path's surrogate keys fit in one
+header; a truncated key list could leave a path unpurged, so such batches
+are sent with ``no-store`` instead.
+
+A batch takes at most ``API_BATCH_PATHS_MAX`` paths. Once the bodies add up
+to ``API_BATCH_MAX_BYTES``, the remaining paths are answered with 413
+instead of being run.
+"""
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import ValidationError
+
+from .renderers import RawJSON
+
+# Request environ passed on to the sub-requests.
+FORWARDED_META = (
+    'REMOTE_ADDR', 'HTTP_X_FORWARDED_FOR', 'HTTP_HOST', 'HTTP_ACCEPT_LANGUAGE',
+    'SCRIPT_NAME', 'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL',
+)
+
+# JSON where the view offers it; other types (e.g. NDJSON exports) are refused.
+ACCEPT = 'application/json, */*;q=0.1'
+
+
+def parse_paths(values, limit):
+    """Validate the requested paths, de-duplicated in order."""
+    paths = list(dict.fromkeys(value for value in values if value))
+    if not paths:
+        raise ValidationError({'path': "At least one path is required."})
+    if len(paths) > limit:
+        raise ValidationError({'path': f"At most {limit} paths can be requested at once."})
+    for path in paths:
+        url = urlsplit(path)
+        if url.scheme or url.netloc or not url.path.startswith('/api/'):
+            raise ValidationError({'path': f"{path!r} is not a relative /api/ path."})
+    return paths
+
+
+def entry(status, body=None):
+    return {'status': status, 'body': body}
+
+
+def sub_request(request, url):
+    """A GET of ``url`` carrying the client environ of ``request``."""
+    environ = {name: request.META[name] for name in FORWARDED_META if name in request.META}
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'HTTP_ACCEPT': ACCEPT,
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': BytesIO(),
+    })
+    return WSGIRequest(environ)
+
+
+def run(request, path):
+    """Return ``(entry, surrogate keys)`` for a GET of ``path`` on behalf of ``request``."""
+    url = urlsplit(path)
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return entry(404, {'detail': "Not found."}), ()
+    if match.url_name == 'api-batch':
+        return entry(400, {'detail': "Batches cannot be nested."}), ()
+    get = sub_request(request, url)
+    # Throttle buckets are per route name, as for direct requests.
+    get.resolver_match = match
+    response = match.func(get, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.streaming or not response.get('Content-Type', '').startswith('application/json'):
+        response.close()
+        return entry(400, {'detail': "Only JSON responses can be batched."}), ()
+    keys = response.get(settings.CDN_SURROGATE_KEY_HEADER, '').split()
+    return entry(response.status_code, RawJSON(response.content) if response.content else None), keys
+
+
+def execute(request, paths):
+    """Run every path; return the entries keyed by path and the combined surrogate keys."""
+    results, keys, size = {}, [], 0
+    for path in paths:
+        if size > settings.API_BATCH_MAX_BYTES:
+            results[path] = entry(413, {'detail': "Batch response size limit reached."})
+            continue
+        results[path], path_keys = run(request, path)
+        keys.extend(path_keys)
+        body = results[path]['body']
+        if isinstance(body, RawJSON):
+            size += len(body)
+    return results, keys
@@ -0,0 +1,123 @@
+"""
+Caching primitives shared by the API.
+
+``VersionStamp`` is a cross-process version number kept in a file: bumping it
+replaces the file, and readers only ``stat()`` it, so every gunicorn worker
+notices a change for the cost of one syscall. ``ProcessCache`` memoizes
+values in the worker's memory until its stamp moves. ``single_flight``
+coalesces recomputation of expensive values stored in the Django cache.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class VersionStamp:
+    """Cross-process version number backed by a stamp file."""
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def path(self):
+        # Resolved on use: stamps are created at import time, before tests
+        # can point CACHE_STAMP_DIR elsewhere.
+        return os.path.join(settings.CACHE_STAMP_DIR, f'{self.name}.stamp')
+
+    def get(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def bump(self):
+        """Move to a new version; atomic rename gives the file a new inode."""
+        os.makedirs(settings.CACHE_STAMP_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=settings.CACHE_STAMP_DIR)
+        os.close(fd)
+        os.replace(tmp_path, self.path)
+
+    def bump_on_commit(self):
+        """Bump once the current transaction commits, so readers never
+        cache data from before the change under the new version."""
+        transaction.on_commit(self.bump)
+
+
+class ProcessCache:
+    """Process-local memo, cleared whenever its ``VersionStamp`` changes."""
+
+    def __init__(self, name):
+        self.stamp = VersionStamp(name)
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = {}
+
+    def get_or_set(self, key, compute):
+        version = self.stamp.get()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._data = {}
+                    self._version = version
+        data = self._data
+        try:
+            return data[key]
+        except KeyError:
+            value = data[key] = compute()
+            return value
+
+    def invalidate(self):
+        self.stamp.bump_on_commit()
+
+
+_model_stamps = {}
+
+
+def model_stamp(model):
+    """The ``VersionStamp`` bumped whenever rows of ``model`` change."""
+    label = model._meta.label_lower
+    stamp = _model_stamps.get(label)
+    if stamp is None:
+        stamp = _model_stamps[label] = VersionStamp(f'model-{label}')
+    return stamp
+
+
+def single_flight(key, version, compute):
+    """
+    Return the value cached under ``key`` for ``version``, computing it at
+    most once at a time per key (stale-while-revalidate).
+
+    On a miss or a version change, the caller that takes the lock (an atomic
+    ``cache.add``) recomputes. Concurrent callers get the stale value if
+    there is one, otherwise wait up to ``API_CACHE_WAIT`` seconds for the
+    winner and compute themselves only if it does not finish in time.
+    """
+    cache = caches[settings.API_CACHE_ALIAS]
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, True, settings.API_CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, (version, value), settings.API_CACHE_TIMEOUT)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + settings.API_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    return compute()
@@ -0,0 +1,195 @@
+"""
+Edge-cache support: Cache-Control/surrogate-key headers and purging.
+
+Every API response is tagged with surrogate keys for the objects it contains
+(``news:42``, ``month:7``, ...) plus a collection key for list responses
+(``news:list``). When an object changes, the purger is asked to drop every
+cached response tagged with its keys, so the edge can keep long TTLs.
+"""
+import logging
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Surrogate key prefix for each model that appears in API responses.
+KEY_PREFIXES = {
+    'core.month': 'month',
+    'core.monthhero': 'hero',
+    'core.mentor': 'mentor',
+    'core.direction': 'direction',
+    'core.news': 'news',
+    'auth.user': 'user',
+    # Archived rows keep their ids and stand for the same objects.
+    'core.archivedmonthhero': 'hero',
+    'core.archivednews': 'news',
+}
+
+# Foreign keys whose target is embedded in the object's representation.
+REFERENCES = {
+    'core.monthhero': [('month_id', 'month'), ('user_id', 'user')],
+    'core.mentor': [('direction_id', 'direction')],
+    'core.archivedmonthhero': [('month_id', 'month'), ('user_id', 'user')],
+}
+
+# Nested lists embedded in the representation, as prefetched by the viewsets
+# (``core.views.nested_prefetch``).
+CHILDREN = {
+    'core.month': ['nested_heroes'],
+    'core.direction': ['nested_mentors'],
+}
+
+
+def collection_key(model):
+    return f"{KEY_PREFIXES[model._meta.label_lower]}:list"
+
+
+def object_key(model, pk):
+    return f"{KEY_PREFIXES[model._meta.label_lower]}:{pk}"
+
+
+def reference_keys(obj):
+    """Keys of the objects referenced by ``obj`` through foreign keys."""
+    keys = set()
+    for attname, prefix in REFERENCES.get(obj._meta.label_lower, ()):
+        value = getattr(obj, attname)
+        if value is not None:
+            keys.add(f"{prefix}:{value}")
+    return keys
+
+
+def surrogate_keys(obj):
+    """Keys for every object included in the representation of ``obj``."""
+    keys = {object_key(type(obj), obj.pk)} | reference_keys(obj)
+    for accessor in CHILDREN.get(obj._meta.label_lower, ()):
+        for child in getattr(obj, accessor):
+            keys |= surrogate_keys(child)
+    return keys
+
+
+def surrogate_key_value(keys):
+    """The surrogate-key header value for ``keys``, in order and de-duplicated."""
+    return ' '.join(dict.fromkeys(keys))
+
+
+def patch_cdn_headers(response, keys=()):
+    """Add Cache-Control, Surrogate-Control and surrogate-key headers.
+
+    ``keys`` is an ordered iterable; duplicates are dropped.
+    """
+    patch_cache_control(response, public=True, max_age=settings.CDN_BROWSER_MAX_AGE)
+    response['Surrogate-Control'] = f"max-age={settings.CDN_EDGE_MAX_AGE}"
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    if keys:
+        value = surrogate_key_value(keys)
+        if len(value) > settings.CDN_SURROGATE_KEY_MAX_LENGTH:
+            # Too many nested objects for one header: keep the leading keys
+            # (callers list collection and top-level keys first).
+            value = value[:settings.CDN_SURROGATE_KEY_MAX_LENGTH].rsplit(' ', 1)[0]
+        response[settings.CDN_SURROGATE_KEY_HEADER] = value
+    return response
+
+
+# ============================================================================
+# PURGERS
+# ============================================================================
+
+class BasePurger:
+    """Interface for edge-cache purge backends."""
+
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class NullPurger(BasePurger):
+    """Purger that does nothing; used when no edge cache is configured."""
+
+    def purge(self, keys):
+        pass
+
+
+class HTTPPurger(BasePurger):
+    """
+    Sends purge requests to an HTTP endpoint, passing the keys in the
+    surrogate-key header (Fastly/Varnish style). Errors are logged, never
+    raised, so an unreachable edge cannot break an admin save.
+    """
+
+    def __init__(self, url, method='POST', headers=None, timeout=2, batch_size=256):
+        self.url = url
+        self.method = method
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+    def purge(self, keys):
+        keys = sorted(keys)
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            request = urllib.request.Request(self.url, method=self.method, headers={
+                **self.headers,
+                settings.CDN_SURROGATE_KEY_HEADER: ' '.join(batch),
+            })
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+            except OSError:
+                logger.exception("Edge purge failed for %d keys", len(batch))
+
+
+_purger = None
+_pending = threading.local()
+
+
+def get_purger():
+    global _purger
+    if _purger is None:
+        _purger = import_string(settings.CDN_PURGER)(**settings.CDN_PURGER_OPTIONS)
+    return _purger
+
+
+def reset_purger():
+    """Forget the configured purger so settings changes take effect."""
+    global _purger
+    _purger = None
+
+
+def _flush():
+    keys = getattr(_pending, 'keys', None)
+    if keys:
+        _pending.keys = set()
+        get_purger().purge(keys)
+
+
+def purge(keys):
+    """
+    Purge ``keys`` once the current transaction commits, batched per
+    transaction. Keys queued by a transaction that rolls back are sent with
+    the next batch; purging too much is always safe.
+    """
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.update(keys)
+    transaction.on_commit(_flush)
+
+
+def _change_keys(model, pks):
+    keys = {object_key(model, pk) for pk in pks}
+    if model._meta.app_label == 'core':
+        keys.add(collection_key(model))
+    return keys
+
+
+def purge_instance(instance):
+    """Purge responses containing ``instance``, its parents and its list."""
+    purge(_change_keys(type(instance), [instance.pk]) | reference_keys(instance))
+
+
+def purge_pks(model, pks):
+    """Purge responses containing any of ``pks`` and the model's list."""
+    purge(_change_keys(model, pks))
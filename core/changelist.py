@@ -0,0 +1,212 @@
+"""
+Admin changelists for tables too large for the stock changelist.
+
+``ScalableChangeListMixin`` replaces the parts of a changelist whose cost
+grows with the table:
+
+* counts: filtered counts stop at ``ADMIN_COUNT_CAP`` (shown as ``1000+``)
+  and the unfiltered total is a rollup refreshed every
+  ``ADMIN_ROLLUP_SECONDS`` instead of a ``COUNT(*)`` per page load;
+* paging: with the admin's default ordering, pages are fetched with an
+  ``?after=``/``?before=`` keyset cursor on ``(ordering field, pk)``
+  instead of ``OFFSET``; explicit column sorting falls back to page numbers;
+* date hierarchy: drill-down links come from a cached rollup of the distinct
+  days of the field instead of ``DISTINCT`` date queries on every load. The
+  rollup ignores other filters, so a link can lead to an empty page.
+
+Rollups are shared through ``core.cache.single_flight``.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import models
+from django.utils.functional import cached_property
+from unfold.views import ChangeList
+
+from .cache import model_stamp, single_flight
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+def rollup(model, name, compute):
+    """Value of ``compute()`` cached per model, refreshed on change or every ``ADMIN_ROLLUP_SECONDS``."""
+    version = (model_stamp(model).get(), int(time.time() // settings.ADMIN_ROLLUP_SECONDS))
+    return single_flight(f'admin-rollup:{model._meta.label_lower}:{name}', version, compute)
+
+
+def estimate_count(queryset):
+    """Return ``(count, exact)``; filtered counts stop at ``ADMIN_COUNT_CAP``."""
+    if not queryset.query.has_filters():
+        model = queryset.model
+        return rollup(model, 'count', model._base_manager.count), True
+    cap = settings.ADMIN_COUNT_CAP
+    count = queryset.order_by().values('pk')[:cap + 1].count()
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        count, self.exact = estimate_count(self.object_list)
+        return count
+
+
+class KeysetPaginator:
+    """Previous/next links for a keyset-paged changelist."""
+    template_name = 'admin/core/keyset_pagination.html'
+
+    def __init__(self, per_page, previous_url, next_url):
+        self.per_page = per_page
+        self.previous_url = previous_url
+        self.next_url = next_url
+
+    def get_elided_page_range(self, *args, **kwargs):
+        return []
+
+
+class ScalableChangeList(ChangeList):
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    def keyset_ordering(self, request):
+        """The default ordering field if it can drive keyset paging, else None."""
+        if ORDER_VAR in self.params or self.show_all or self.list_editable:
+            return None
+        ordering = self.model_admin.get_ordering(request) or self.lookup_opts.ordering
+        if len(ordering) != 1 or not isinstance(ordering[0], str):
+            return None
+        try:
+            field = self.lookup_opts.get_field(ordering[0].lstrip('-'))
+        except FieldDoesNotExist:
+            return None
+        return ordering[0] if field.concrete and not field.null else None
+
+    def encode_cursor(self, obj, name):
+        return f'{self.lookup_opts.get_field(name).value_to_string(obj)}~{obj.pk}'
+
+    def decode_cursor(self, name, cursor):
+        value, _, pk = cursor.rpartition('~')
+        try:
+            return self.lookup_opts.get_field(name).to_python(value), int(pk)
+        except (ValidationError, ValueError):
+            raise IncorrectLookupParameters
+
+    def get_results(self, request):
+        ordering = self.keyset_ordering(request)
+        if ordering is None:
+            super().get_results(request)
+            self.result_count_exact = getattr(self.paginator, 'exact', True)
+            return
+
+        # Django's deterministic ordering appends '-pk' to the field.
+        name = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        queryset = self.queryset
+        after, before = self.params.get(AFTER_VAR), self.params.get(BEFORE_VAR)
+        if before or after:
+            value, pk = self.decode_cursor(name, before or after)
+            use_lt = descending != bool(before)
+            field_lookup = f'{name}__lt' if use_lt else f'{name}__gt'
+            pk_lookup = 'pk__gt' if before else 'pk__lt'
+            queryset = queryset.filter(
+                models.Q(**{field_lookup: value}) | models.Q(**{name: value, pk_lookup: pk})
+            )
+            if before:
+                queryset = queryset.reverse()
+        rows = list(queryset[:self.list_per_page + 1])
+        more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if before:
+            rows.reverse()
+
+        has_previous = bool(after) or (bool(before) and more)
+        has_next = bool(before) or more
+        previous_url = next_url = None
+        if rows and has_previous:
+            previous_url = self.get_query_string({BEFORE_VAR: self.encode_cursor(rows[0], name)}, [AFTER_VAR, PAGE_VAR])
+        if rows and has_next:
+            next_url = self.get_query_string({AFTER_VAR: self.encode_cursor(rows[-1], name)}, [BEFORE_VAR, PAGE_VAR])
+
+        self.result_count, self.result_count_exact = estimate_count(self.queryset)
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_previous or has_next
+        self.paginator = KeysetPaginator(self.list_per_page, previous_url, next_url)
+
+
+class DateRollup:
+    """
+    Stand-in for ``cl.queryset`` in Django's date hierarchy: answers its
+    ``aggregate(first=Min, last=Max)`` and ``dates``/``datetimes`` calls from
+    the rolled-up distinct days, narrowed by the selected year and month.
+    """
+
+    def __init__(self, cl):
+        field_name = cl.date_hierarchy
+        field = get_fields_from_path(cl.model, field_name)[-1]
+        kind = 'datetimes' if isinstance(field, models.DateTimeField) else 'dates'
+        manager = cl.model._base_manager
+        days = rollup(cl.model, f'{kind}:{field_name}', lambda: list(getattr(manager, kind)(field_name, 'day')))
+        try:
+            year = int(cl.params.get(f'{field_name}__year') or 0)
+            month = int(cl.params.get(f'{field_name}__month') or 0)
+        except ValueError:
+            year = month = 0
+        self.days = [
+            day for day in days
+            if (not year or day.year == year) and (not month or day.month == month)
+        ]
+
+    def aggregate(self, **aggregates):
+        first, last = (self.days[0], self.days[-1]) if self.days else (None, None)
+        return {'first': first, 'last': last}
+
+    def datetimes(self, field_name, kind):
+        if kind == 'year':
+            truncated = (day.replace(month=1, day=1) for day in self.days)
+        elif kind == 'month':
+            truncated = (day.replace(day=1) for day in self.days)
+        else:
+            truncated = self.days
+        return list(dict.fromkeys(truncated))
+
+    dates = datetimes
+
+
+class RollupChangeList:
+    """A changelist whose ``queryset`` is a ``DateRollup``, for the date hierarchy tag."""
+
+    def __init__(self, cl):
+        self._cl = cl
+        self.queryset = DateRollup(cl)
+
+    def __getattr__(self, name):
+        return getattr(self._cl, name)
+
+
+class ScalableChangeListMixin:
+    """ModelAdmin mixin switching the changelist to ``ScalableChangeList``."""
+    change_list_template = 'admin/core/scalable_change_list.html'
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ScalableChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
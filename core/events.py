@@ -0,0 +1,246 @@
+"""
+Fan-out bus for live update events (create/update/deactivate/delete of News
+and MonthHero), consumed by the Server-Sent Events stream in ``core.sse``.
+
+Events are published from model signals after commit. ``LocalBackend``
+delivers them to subscribers in the same process; ``FileBackend`` appends them
+to a shared log that every ASGI worker tails, for multi-worker deployments.
+Event ids come from the backend, so with ``FileBackend`` a ``Last-Event-ID``
+means the same event on every worker.
+
+Memory is bounded: each subscriber has a fixed-size queue and a subscriber
+whose queue overflows is dropped rather than buffered. A client resuming
+further back than the history or the queue can cover gets a single
+``resync`` event instead, and should reload what it displays.
+"""
+import asyncio
+import fcntl
+import itertools
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Sentinel queued for a subscriber that has been dropped.
+CLOSED = None
+
+
+class Subscriber:
+    """One SSE connection: a bounded queue bound to its event loop."""
+
+    def __init__(self, loop, topics, queue_size):
+        self.loop = loop
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def wants(self, event):
+        return not self.topics or event['topic'] in self.topics
+
+
+class EventBus:
+    """Process-local fan-out from publishers (any thread) to subscribers."""
+
+    def __init__(self, max_subscribers, queue_size, history_size):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.history = deque(maxlen=history_size)
+        # Id of the newest event seen, dispatched or (on start) in the shared log.
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=()):
+        """Register a subscriber on the running loop, or return None when full."""
+        with self._lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(asyncio.get_running_loop(), frozenset(topics), self.queue_size)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def replay(self, subscriber, last_id):
+        """
+        Queue buffered events newer than ``last_id`` (``Last-Event-ID`` resume).
+
+        When events after ``last_id`` are no longer buffered, or would fill
+        more than half the queue, a single ``resync`` frame is queued instead,
+        so a client far behind is not dropped on every reconnect.
+        """
+        with self._lock:
+            history, newest = list(self.history), self.last_id
+        if last_id == newest:
+            return
+        covered = bool(history) and history[0][0] <= last_id + 1
+        missed = [frame for event_id, event, frame in history if event_id > last_id and subscriber.wants(event)]
+        if last_id > newest or not covered or len(missed) > self.queue_size // 2:
+            subscriber.queue.put_nowait(encode_frame(newest, {'type': 'resync'}))
+            return
+        for frame in missed:
+            self._deliver(subscriber, frame)
+
+    def dispatch(self, event_id, event):
+        """Deliver ``event`` to every interested subscriber; thread-safe."""
+        frame = encode_frame(event_id, event)
+        with self._lock:
+            self.last_id = max(self.last_id, event_id)
+            self.history.append((event_id, event, frame))
+            subscribers = [s for s in self.subscribers if s.wants(event)]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, frame)
+            except RuntimeError:
+                # The subscriber's loop has been closed.
+                self.unsubscribe(subscriber)
+
+    def _deliver(self, subscriber, frame):
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Slow consumer: drop it instead of buffering without bound.
+            subscriber.dropped = True
+            self.unsubscribe(subscriber)
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(CLOSED)
+
+
+def encode_frame(event_id, event):
+    data = json.dumps(event, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class LocalBackend:
+    """Deliver events to subscribers in this process only."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            event_id = next(self._ids)
+        self.bus.dispatch(event_id, event)
+
+    def start(self):
+        pass
+
+
+class FileBackend:
+    """
+    Share events between processes through an append-only JSON-lines file.
+    Publishers append one line per event; each process serving streams tails
+    the file and dispatches new lines to its local subscribers. Event ids are
+    a sequence kept next to the log (``<path>.seq``) and taken under an
+    exclusive lock, which also keeps the log in id order.
+    """
+
+    def __init__(self, bus, path, poll_interval=0.25, max_bytes=10 * 1024 * 1024):
+        self.bus = bus
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._task = None
+
+    def publish(self, event):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.seq', 'a+') as seq:
+            # Held until the file is closed.
+            fcntl.flock(seq, fcntl.LOCK_EX)
+            seq.seek(0)
+            event_id = int(seq.read() or 0) + 1
+            seq.truncate(0)
+            seq.write(str(event_id))
+            seq.flush()
+            line = (json.dumps({'id': event_id, 'event': event}, separators=(',', ':')) + '\n').encode()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                if os.fstat(fd).st_size > self.max_bytes:
+                    # Readers notice the new inode and start from its beginning.
+                    os.replace(self.path, self.path + '.1')
+            finally:
+                os.close(fd)
+
+    def last_id(self):
+        try:
+            with open(self.path + '.seq') as seq:
+                return int(seq.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._tail())
+            # Resuming clients are compared against the shared sequence, not
+            # only the events this process has seen.
+            self.bus.last_id = max(self.bus.last_id, self.last_id())
+
+    async def _tail(self):
+        inode, offset = None, 0
+        try:
+            stat = os.stat(self.path)
+            inode, offset = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            pass
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                continue
+            if stat.st_ino != inode:
+                inode, offset = stat.st_ino, 0
+            if stat.st_size <= offset:
+                continue
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(stat.st_size - offset)
+            # Only consume complete lines.
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+            offset += len(chunk)
+            for line in chunk.splitlines():
+                try:
+                    record = json.loads(line)
+                    self.bus.dispatch(record['id'], record['event'])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Skipping malformed event line")
+
+
+bus = EventBus(
+    max_subscribers=settings.EVENTS_MAX_SUBSCRIBERS,
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    history_size=settings.EVENTS_HISTORY_SIZE,
+)
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.EVENTS_BACKEND)(bus, **settings.EVENTS_BACKEND_OPTIONS)
+    return _backend
+
+
+def publish(topic, action, pks):
+    """Publish ``<topic>.<action>`` for objects ``pks`` after the current transaction commits."""
+    event = {'type': f'{topic}.{action}', 'topic': topic, 'ids': list(pks)}
+    transaction.on_commit(lambda: get_backend().publish(event))
@@ -0,0 +1,76 @@
+"""
+Streaming NDJSON exports (``/api/<resource>/export/``).
+
+An export walks the listing in primary-key order with
+``QuerySet.iterator(chunk_size=API_EXPORT_CHUNK_SIZE)`` and serializes one
+chunk at a time, so memory stays flat whatever the table size. Every line
+carries the object's ``id``; an interrupted transfer resumes from the last
+complete line with ``?after=<id>``.
+
+The body is gzip-compressed on the fly when the client accepts it. Under
+ASGI the chunks are produced in a worker thread one at a time (Django would
+otherwise read a synchronous iterator to the end before sending anything).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence
+from rest_framework.exceptions import ValidationError
+
+from .renderers import NDJSONRenderer, ndjson
+
+accepts_gzip_re = _lazy_re_compile(r'\bgzip\b')
+
+
+def parse_cursor(value):
+    """``?after=`` as a primary key; 0 when absent."""
+    if value in (None, ''):
+        return 0
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({'after': "Expected the id of the last exported object."})
+
+
+def chunked_queryset(queryset, size):
+    """Lists of up to ``size`` objects, read with a streaming cursor."""
+    chunk = []
+    for obj in queryset.iterator(chunk_size=size):
+        chunk.append(obj)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_lines(queryset, serialize):
+    """NDJSON byte strings for ``queryset``; ``serialize`` maps a chunk to representations."""
+    for chunk in chunked_queryset(queryset, settings.API_EXPORT_CHUNK_SIZE):
+        yield ndjson(serialize(chunk))
+
+
+async def _in_thread(iterator):
+    iterator = iter(iterator)
+    next_part = sync_to_async(next)
+    while (part := await next_part(iterator, None)) is not None:
+        yield part
+
+
+def streaming_response(request, lines):
+    """``StreamingHttpResponse`` sending ``lines``, gzipped if accepted."""
+    gzipped = bool(accepts_gzip_re.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    if gzipped:
+        lines = compress_sequence(lines)
+    if isinstance(request, ASGIRequest):
+        lines = _in_thread(lines)
+    response = StreamingHttpResponse(lines, content_type=NDJSONRenderer.media_type)
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,41 @@
+import django_filters
+
+from .models import ArchivedMonthHero, ArchivedNews, MonthHero, Mentor, News
+
+
+class MonthHeroFilter(django_filters.FilterSet):
+    """``?month=&type=&user=&created_at_after=&created_at_before=``"""
+    created_at = django_filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = MonthHero
+        fields = ['month', 'type', 'user', 'created_at']
+
+
+class ArchivedMonthHeroFilter(MonthHeroFilter):
+
+    class Meta(MonthHeroFilter.Meta):
+        model = ArchivedMonthHero
+
+
+class MentorFilter(django_filters.FilterSet):
+    """``?direction=``"""
+
+    class Meta:
+        model = Mentor
+        fields = ['direction']
+
+
+class NewsFilter(django_filters.FilterSet):
+    """``?created_at_after=&created_at_before=``"""
+    created_at = django_filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = News
+        fields = ['created_at']
+
+
+class ArchivedNewsFilter(NewsFilter):
+
+    class Meta(NewsFilter.Meta):
+        model = ArchivedNews
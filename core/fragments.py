@@ -0,0 +1,95 @@
+"""
+Per-object cache of serialized JSON, assembled into list responses.
+
+``FragmentCache`` keeps each object's rendered representation under
+``fragment:<model>:<pk>``, tagged with the object's ``updated_at`` and the
+request origin (image URLs are absolute). Lists look up every object of the
+page with one ``get_many``, serialize only the misses in one batch and embed
+the cached bytes as ``RawJSON``, so the renderers never re-encode them.
+
+Entries are deleted after commit when the object changes, and so are the
+entries of objects embedding it (``cdn.REFERENCES``: a hero embeds its user
+and month name, a mentor its direction title). See ``core.receivers``.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import cdn
+from .renderers import ORJSONRenderer, RawJSON
+
+_renderer = ORJSONRenderer()
+
+
+class FragmentCache:
+    """Serialized fragments of ``model`` instances."""
+
+    def __init__(self, model):
+        self.model = model
+        self.label = model._meta.label_lower
+
+    @property
+    def cache(self):
+        return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+    def key(self, pk):
+        return f'fragment:{self.label}:{pk}'
+
+    def render(self, objects, serialize, origin):
+        """
+        Return ``objects`` as a list of ``RawJSON`` fragments; ``serialize``
+        turns a list of instances into a list of representations.
+        """
+        objects = list(objects)
+        keys = [self.key(obj.pk) for obj in objects]
+        cached = self.cache.get_many(keys)
+        fragments, misses = [], []
+        for obj, key in zip(objects, keys):
+            entry = cached.get(key)
+            if entry is not None and entry[:2] == (obj.updated_at, origin):
+                fragments.append(RawJSON(entry[2]))
+            else:
+                fragments.append(None)
+                misses.append((len(fragments) - 1, obj))
+        if misses:
+            rendered = {}
+            data = serialize([obj for _, obj in misses])
+            for (index, obj), item in zip(misses, data):
+                body = _renderer.render(item)
+                fragments[index] = RawJSON(body)
+                rendered[self.key(obj.pk)] = (obj.updated_at, origin, body)
+            self.cache.set_many(rendered, settings.FRAGMENT_CACHE_TIMEOUT)
+        return fragments
+
+    def delete_on_commit(self, pks):
+        keys = [self.key(pk) for pk in pks]
+        if keys:
+            transaction.on_commit(lambda: self.cache.delete_many(keys))
+
+
+# Fragment caches by model, filled by register().
+caches_by_model = {}
+
+
+def register(model):
+    fragment_cache = caches_by_model.get(model)
+    if fragment_cache is None:
+        fragment_cache = caches_by_model[model] = FragmentCache(model)
+    return fragment_cache
+
+
+def invalidate(model, pks):
+    """Drop the fragments of ``pks`` and of the objects embedding them."""
+    pks = list(pks)
+    if model in caches_by_model:
+        caches_by_model[model].delete_on_commit(pks)
+    prefix = cdn.KEY_PREFIXES.get(model._meta.label_lower)
+    for label, references in cdn.REFERENCES.items():
+        dependent = apps.get_model(label)
+        if dependent not in caches_by_model:
+            continue
+        for attname, referenced in references:
+            if referenced == prefix:
+                dependents = dependent._base_manager.filter(**{f'{attname}__in': pks}).values_list('pk', flat=True)
+                caches_by_model[dependent].delete_on_commit(list(dependents))
@@ -0,0 +1,148 @@
+"""
+HTML clean-up for rich-text fields edited with the WYSIWYG widget.
+
+``sanitize_html`` keeps an allow-list of formatting tags and attributes,
+drops scripts, event handlers and ``javascript:`` links, and collapses
+whitespace. ``html_to_text`` and ``excerpt`` derive the plain-text summary
+shown in listings.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's',
+    'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead',
+    'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+VOID_TAGS = {'br', 'embed', 'hr', 'img'}
+# Elements dropped together with their content.
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript'}
+# Elements that separate words in the plain-text rendering.
+BLOCK_TAGS = {
+    'blockquote', 'br', 'div', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+
+WHITESPACE = re.compile(r'\s+')
+SCHEME = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+# Browsers ignore control characters and whitespace when reading a URL scheme.
+IGNORED_IN_SCHEME = re.compile(r'[\x00-\x20\x7f\s]+')
+
+
+def is_safe_url(url):
+    match = SCHEME.match(IGNORED_IN_SCHEME.sub('', url))
+    return match is None or match.group(1).lower() in ALLOWED_SCHEMES
+
+
+class Sanitizer(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+        self.pre = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            # Void elements have no content to drop and no end tag.
+            if tag not in VOID_TAGS:
+                self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            parts.append(f'{name}="{escape(value)}"')
+        if tag == 'a' and any(name == 'target' for name, _ in attrs):
+            parts = [part for part in parts if not part.startswith('rel=')] + ['rel="noopener noreferrer"']
+        self.html.append(f"<{' '.join(parts)}>")
+        if tag == 'pre':
+            self.pre += 1
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            # Self-closed, so there is no content to drop.
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag in ALLOWED_TAGS and not self.dropping:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside this element.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == 'pre':
+                self.pre -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.text.append(data)
+        if not self.pre:
+            data = WHITESPACE.sub(' ', data)
+        self.html.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def sanitize_html(html):
+    """Return ``(clean_html, plain_text)`` for an untrusted HTML fragment."""
+    parser = Sanitizer()
+    parser.feed(html or '')
+    parser.close()
+    clean = ''.join(parser.html).strip()
+    text = WHITESPACE.sub(' ', ''.join(parser.text)).strip()
+    return clean, text
+
+
+def html_to_text(html):
+    return sanitize_html(html)[1]
+
+
+def excerpt(text, length):
+    """Cut ``text`` at a word boundary to at most ``length`` characters."""
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip(' ,.;:') + '…'
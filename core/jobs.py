@@ -0,0 +1,163 @@
+"""
+Database-backed queue for slow admin work.
+
+``enqueue()`` stores a ``Job`` naming a function registered with ``@task``
+(see ``core.tasks``); ``manage.py run_worker`` processes claim due jobs and
+run them. Claiming is a conditional ``UPDATE`` on the job's status and
+attempt count, so two workers never take the same job and no row lock is
+held while it runs.
+
+A claimed job belongs to its worker until ``locked_until``
+(``JOB_VISIBILITY_TIMEOUT`` seconds, extended by every ``report()``). If the
+worker dies, another one takes the job over once that passes. A task whose
+worker has lost the job, or whose job was cancelled, is stopped at its next
+``report()``. Failed attempts are retried after ``JOB_RETRY_DELAY`` seconds,
+doubling each time, up to the job's ``max_attempts``.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions by name, filled by @task.
+TASKS = {}
+
+# Due jobs examined per claim; the first one not taken by another worker wins.
+CLAIM_BATCH = 10
+
+
+class JobAborted(Exception):
+    """The job was cancelled or taken over by another worker."""
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Register ``func(job, **args)`` as a task; use as ``@task`` or ``@task(...)``."""
+    def decorator(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        TASKS[func.task_name] = func
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(func, user=None, **args):
+    """Queue ``func`` (a ``@task``) with JSON-serializable keyword ``args``."""
+    return Job.objects.create(
+        task=func.task_name,
+        args=args,
+        max_attempts=func.max_attempts or settings.JOB_MAX_ATTEMPTS,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _owned(job):
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker, attempts=job.attempts)
+
+
+def report(job, progress, total=None, message=None):
+    """Record progress and extend the job's lease; raise ``JobAborted`` if it was lost."""
+    fields = {
+        'progress': progress,
+        'locked_until': timezone.now() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+    }
+    if total is not None:
+        fields['total'] = total
+    if message is not None:
+        fields['message'] = message[:255]
+    if not _owned(job).update(**fields):
+        raise JobAborted(f"{job} is no longer held by {job.worker}")
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def claim(worker):
+    """Take the next due job for ``worker``, or return None."""
+    now = timezone.now()
+    due = Job.objects.filter(
+        Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+    ).order_by('run_after', 'pk')
+    for job in due[:CLAIM_BATCH]:
+        current = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts)
+        if job.status == Job.RUNNING and job.attempts >= job.max_attempts:
+            # The worker died during the last attempt.
+            current.update(
+                status=Job.FAILED, locked_until=None, finished_at=now,
+                error=job.error or "Worker stopped responding.",
+            )
+            continue
+        claimed = current.update(
+            status=Job.RUNNING,
+            worker=worker,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+            started_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome."""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        result = func(job, **job.args)
+    except JobAborted:
+        logger.info("%s aborted", job)
+    except Exception:
+        logger.exception("%s failed (attempt %d of %d)", job, job.attempts, job.max_attempts)
+        now = timezone.now()
+        fields = {'error': traceback.format_exc(), 'locked_until': None}
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            fields.update(status=Job.QUEUED, run_after=now + timedelta(seconds=delay))
+        else:
+            fields.update(status=Job.FAILED, finished_at=now)
+        _owned(job).update(**fields)
+    else:
+        fields = {'status': Job.DONE, 'result': result, 'locked_until': None, 'finished_at': timezone.now()}
+        if job.total is not None:
+            fields['progress'] = job.total
+        _owned(job).update(**fields)
+
+
+def run_pending(worker=None):
+    """Run due jobs until none is left; return how many were run."""
+    worker = worker or worker_name()
+    count = 0
+    while (job := claim(worker)) is not None:
+        run_job(job)
+        count += 1
+    return count
+
+
+def work(stop, burst=False):
+    """Worker loop: run due jobs, polling every ``JOB_POLL_INTERVAL`` seconds until ``stop`` is set."""
+    worker = worker_name()
+    while not stop.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is not None:
+            run_job(job)
+        elif burst:
+            break
+        else:
+            stop.wait(settings.JOB_POLL_INTERVAL)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = "Move old news and the heroes of closed months to the archive tables (core.archive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only count the rows that would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            counts = {
+                'news': archive.archivable_news().count(),
+                'heroes': archive.archivable_heroes().count(),
+            }
+            verb = "would be archived"
+        else:
+            counts = archive.archive_history(options['batch_size'])
+            verb = "archived"
+        self.stdout.write(self.style.SUCCESS(f"{counts['news']} news and {counts['heroes']} heroes {verb}"))
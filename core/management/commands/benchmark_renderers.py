@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.prerender import InternalClient
+from core.renderers import ORJSONRenderer, MessagePackRenderer
+from core.views import MonthViewSet
+
+
+class Command(BaseCommand):
+    help = "Compare encode time and payload size of the API renderers on /api/months/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--page', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # Requested as from the public host, which ALLOWED_HOSTS accepts.
+        client = InternalClient(settings.PRERENDER_BASE_URL)
+        request = client.request('/api/months/', {'page': options['page']})
+        view = MonthViewSet.as_view({'get': 'list'})
+        data = view(request).data
+
+        renderers = [
+            ('stdlib json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+            ('msgpack', MessagePackRenderer()),
+        ]
+        iterations = options['iterations']
+        baseline = None
+
+        self.stdout.write(f"{'renderer':<12} {'bytes':>10} {'us/encode':>12} {'speedup':>8}")
+        for name, renderer in renderers:
+            payload = renderer.render(data)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                renderer.render(data)
+            per_call = (time.perf_counter() - start) / iterations * 1e6
+            baseline = baseline or per_call
+            self.stdout.write(
+                f"{name:<12} {len(payload):>10} {per_call:>12.1f} {baseline / per_call:>7.1f}x"
+            )
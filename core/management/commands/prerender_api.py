@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import prerender
+
+
+class Command(BaseCommand):
+    help = "Write the public API as static JSON (+ .gz/.br) files under PRERENDER_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Re-render every resource instead of only those changed since the last build.",
+        )
+
+    def handle(self, *args, **options):
+        result = prerender.build(full=options['full'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.written} files written, {result.unchanged} unchanged in {settings.PRERENDER_ROOT}"
+        ))
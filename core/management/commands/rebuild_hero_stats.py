@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core import stats
+
+
+class Command(BaseCommand):
+    help = "Recount the hero statistics rollup tables served by /api/stats/"
+
+    def handle(self, *args, **options):
+        rows = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows['user']} users, {rows['month']} months, {rows['period']} periods"
+        ))
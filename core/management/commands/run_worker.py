@@ -0,0 +1,52 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs, tasks  # noqa: F401 (registers the tasks)
+
+
+def _work(burst):
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        # Finish the current job, then exit.
+        signal.signal(signum, lambda *args: stop.set())
+    jobs.work(stop, burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (core.jobs) in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES)
+        parser.add_argument(
+            '--burst', action='store_true',
+            help="Exit once no job is due instead of polling for new ones.",
+        )
+
+    def handle(self, *args, **options):
+        count = max(1, options['processes'])
+        self.stdout.write(f"Starting {count} job worker(s)")
+        if count == 1:
+            _work(options['burst'])
+            return
+        # Forked children must open their own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_work, args=(options['burst'],)) for _ in range(count)]
+        for worker in workers:
+            worker.start()
+
+        def stop_workers(*args):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        # worker.terminate() sends SIGTERM: each worker finishes its job first.
+        signal.signal(signal.SIGTERM, stop_workers)
+        signal.signal(signal.SIGINT, stop_workers)
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import warming
+
+
+class Command(BaseCommand):
+    help = "Render the hot API paths into the shared response cache (API_CACHE_ALIAS), e.g. after a deploy"
+
+    def handle(self, *args, **options):
+        rendered = warming.warm()
+        self.stdout.write(self.style.SUCCESS(f"{rendered or 0} paths rendered"))
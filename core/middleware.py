@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+
+import brotli
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import refdata
+
+# Encodings in server preference order.
+ENCODERS = {
+    'br': lambda body: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY),
+    'gzip': lambda body: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0),
+}
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack', 'text/')
+
+accept_encoding_re = _lazy_re_compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def negotiate_encoding(header):
+    """Return the preferred encoding from ``ENCODERS`` accepted by the client."""
+    if not header:
+        return None
+    accepted = {}
+    for part in header.lower().split(','):
+        match = accept_encoding_re.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1)] = quality
+    for encoding in ENCODERS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip response compression for the public API.
+
+    Compressed bodies are stored in a cache keyed by a digest of the
+    uncompressed payload, so identical responses (e.g. cached list pages)
+    are served from pre-compressed bytes instead of being recompressed on
+    every request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cache = caches[settings.COMPRESSION_CACHE_ALIAS]
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not request.path.startswith(settings.COMPRESSION_PATH_PREFIXES):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        response.content = self.compress(response.content, encoding)
+        response['Content-Length'] = str(len(response.content))
+        response['Content-Encoding'] = encoding
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def compress(self, body, encoding):
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        key = f'compressed:{encoding}:{digest}'
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = ENCODERS[encoding](body)
+            self.cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed
+
+
+class ReferenceDataMiddleware:
+    """Check the ``core.refdata`` version stamps at most once per request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        refdata.begin_request()
+        try:
+            return self.get_response(request)
+        finally:
+            refdata.end_request()
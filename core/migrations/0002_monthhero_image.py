@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:26
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthhero',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to=core.models.month_hero_image_path),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_monthhero_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentor',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['full_name'], name='mentor_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mentor',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['direction', 'full_name'], name='mentor_direction_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthhero',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='hero_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthhero',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['month', '-created_at'], name='hero_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthhero',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['type', '-created_at'], name='hero_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthhero',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-created_at'], name='hero_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='news_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def updated_at_field():
+    return models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='direction',
+            name='updated_at',
+            field=updated_at_field(),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='mentor',
+            name='updated_at',
+            field=updated_at_field(),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='month',
+            name='updated_at',
+            field=updated_at_field(),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthhero',
+            name='updated_at',
+            field=updated_at_field(),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='updated_at',
+            field=updated_at_field(),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_existing_users(apps, schema_editor):
+    from core.search import user_terms
+
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserSearchTerm = apps.get_model('core', 'UserSearchTerm')
+    UserSearchTrigram = apps.get_model('core', 'UserSearchTrigram')
+    term_rows, trigram_rows = [], []
+    users = User.objects.values_list('pk', 'username', 'first_name', 'last_name', 'email')
+    for pk, *fields in users.iterator(chunk_size=2000):
+        terms, trigrams = user_terms(*fields)
+        term_rows.extend(UserSearchTerm(user_id=pk, term=term) for term in terms)
+        trigram_rows.extend(UserSearchTrigram(user_id=pk, trigram=trigram) for trigram in trigrams)
+        if len(trigram_rows) >= 10000:
+            UserSearchTerm.objects.bulk_create(term_rows, batch_size=1000)
+            UserSearchTrigram.objects.bulk_create(trigram_rows, batch_size=1000)
+            term_rows, trigram_rows = [], []
+    UserSearchTerm.objects.bulk_create(term_rows, batch_size=1000)
+    UserSearchTrigram.objects.bulk_create(trigram_rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sync_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Search Term',
+                'verbose_name_plural': 'User Search Terms',
+                'indexes': [models.Index(fields=['term', 'user'], name='user_search_term_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Search Trigram',
+                'verbose_name_plural': 'User Search Trigrams',
+                'indexes': [models.Index(fields=['trigram', 'user'], name='user_search_trigram_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def summarize_existing_news(apps, schema_editor):
+    from core.html import excerpt, sanitize_html
+
+    News = apps.get_model('core', 'News')
+    batch = []
+    for news in News.objects.only('pk', 'content').iterator(chunk_size=500):
+        news.content_html, text = sanitize_html(news.content)
+        news.excerpt = excerpt(text, 280)
+        news.word_count = len(text.split())
+        batch.append(news)
+        if len(batch) == 500:
+            News.objects.bulk_update(batch, ['content_html', 'excerpt', 'word_count'])
+            batch = []
+    News.objects.bulk_update(batch, ['content_html', 'excerpt', 'word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=280),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(summarize_existing_news, migrations.RunPython.noop),
+    ]
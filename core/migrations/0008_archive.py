@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:00
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('content', models.TextField()),
+                ('content_html', models.TextField(blank=True, editable=False)),
+                ('excerpt', models.CharField(blank=True, editable=False, max_length=280)),
+                ('word_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('image', models.ImageField(blank=True, null=True, upload_to='news/')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived News',
+                'verbose_name_plural': 'Archived News',
+                'ordering': ['-created_at'],
+                'abstract': False,
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='news_archive_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedMonthHero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('student', 'Student'), ('teacher', 'Teacher')], max_length=20)),
+                ('image', models.ImageField(blank=True, null=True, upload_to=core.models.month_hero_image_path)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('month', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_heroes', to='core.month')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_month_heroes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Month Hero',
+                'verbose_name_plural': 'Archived Month Heroes',
+                'ordering': ['-created_at'],
+                'abstract': False,
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='hero_archive_created_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['month', '-created_at'], name='hero_archive_month_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['user', '-created_at'], name='hero_archive_user_idx')],
+            },
+        ),
+    ]
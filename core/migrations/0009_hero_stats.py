@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Max
+from django.db.models.functions import TruncMonth
+
+
+def fill_hero_stats(apps, schema_editor):
+    """Count the existing active heroes, live and archived, as core.stats.rebuild() does."""
+    sources = [apps.get_model('core', 'MonthHero'), apps.get_model('core', 'ArchivedMonthHero')]
+    rollups = [
+        (apps.get_model('core', 'UserHeroStats'), 'user_id'),
+        (apps.get_model('core', 'MonthHeroStats'), 'month_id'),
+        (apps.get_model('core', 'HeroTimelineStats'), 'period'),
+    ]
+    type_fields = {'student': 'students', 'teacher': 'teachers'}
+    for model, field in rollups:
+        counts = {}
+        for source in sources:
+            heroes = source.objects.filter(is_active=True)
+            if field == 'period':
+                heroes = heroes.annotate(period=TruncMonth('created_at', output_field=DateField()))
+            rows = heroes.values(field, 'type').annotate(count=Count('pk'), last=Max('created_at')).order_by()
+            for row in rows:
+                values = counts.setdefault(row[field], {'students': 0, 'teachers': 0, 'total': 0, 'last_awarded_at': None})
+                if row['type'] in type_fields:
+                    values[type_fields[row['type']]] += row['count']
+                values['total'] += row['count']
+                values['last_awarded_at'] = max(values['last_awarded_at'] or row['last'], row['last'])
+        model.objects.bulk_create(
+            (model(**{field: key}, **values) for key, values in counts.items()), batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeroTimelineStats',
+            fields=[
+                ('students', models.PositiveIntegerField(default=0)),
+                ('teachers', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_awarded_at', models.DateTimeField()),
+                ('period', models.DateField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'Hero Timeline Stats',
+                'verbose_name_plural': 'Hero Timeline Stats',
+                'ordering': ['period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthHeroStats',
+            fields=[
+                ('students', models.PositiveIntegerField(default=0)),
+                ('teachers', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_awarded_at', models.DateTimeField()),
+                ('month', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hero_stats', serialize=False, to='core.month')),
+            ],
+            options={
+                'verbose_name': 'Month Hero Stats',
+                'verbose_name_plural': 'Month Hero Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserHeroStats',
+            fields=[
+                ('students', models.PositiveIntegerField(default=0)),
+                ('teachers', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_awarded_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hero_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Hero Stats',
+                'verbose_name_plural': 'User Hero Stats',
+                'indexes': [models.Index(fields=['-total', 'user'], name='stats_user_total_idx'), models.Index(fields=['-students', 'user'], name='stats_user_students_idx'), models.Index(fields=['-teachers', 'user'], name='stats_user_teachers_idx')],
+            },
+        ),
+        migrations.RunPython(fill_hero_stats, migrations.RunPython.noop),
+    ]
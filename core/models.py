@@ -1,5 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .html import excerpt, sanitize_html
+from .signals import bulk_updated
+
+
+class TrackedQuerySet(models.QuerySet):
+    """QuerySet whose bulk ``update()`` bumps ``updated_at`` and notifies ``bulk_updated``."""
+
+    def update(self, **kwargs):
+        pks = list(self.values_list('pk', flat=True))
+        if not pks:
+            return 0
+        if any(field.name == 'updated_at' for field in self.model._meta.concrete_fields):
+            kwargs.setdefault('updated_at', timezone.now())
+        rows = super().update(**kwargs)
+        bulk_updated.send(sender=self.model, pks=pks, fields=set(kwargs))
+        return rows
+
+
+# Partial-index condition for the public listings, which only show active rows.
+ACTIVE = models.Q(is_active=True)
 
 
 class Month(models.Model):
@@ -8,6 +30,9 @@ class Month(models.Model):
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TrackedQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -24,6 +49,9 @@ class Direction(models.Model):
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TrackedQuerySet.as_manager()
 
     class Meta:
         ordering = ['title']
@@ -43,32 +71,88 @@ class Mentor(models.Model):
     bio = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TrackedQuerySet.as_manager()
 
     class Meta:
         ordering = ['full_name']
         verbose_name = "Mentor"
         verbose_name_plural = "Mentors"
+        indexes = [
+            models.Index(fields=['full_name'], condition=ACTIVE, name='mentor_active_name_idx'),
+            models.Index(fields=['direction', 'full_name'], condition=ACTIVE, name='mentor_direction_idx'),
+        ]
 
     def __str__(self):
         return self.full_name
 
 
-class News(models.Model):
-    """Represents a news article or announcement."""
+class NewsFields(models.Model):
+    """Columns and behaviour shared by ``News`` and ``ArchivedNews``."""
+    EXCERPT_LENGTH = 280
+
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Derived from ``content`` on save (see ``update_summary``).
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='news/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TrackedQuerySet.as_manager()
+
+    SUMMARY_FIELDS = ('content_html', 'excerpt', 'word_count')
 
     class Meta:
+        abstract = True
         ordering = ['-created_at']
-        verbose_name = "News"
-        verbose_name_plural = "News"
 
     def __str__(self):
         return self.title
 
+    def update_summary(self):
+        """Recompute the sanitized HTML, plain-text excerpt and word count."""
+        self.content_html, text = sanitize_html(self.content)
+        self.excerpt = excerpt(text, self.EXCERPT_LENGTH)
+        self.word_count = len(text.split())
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or 'content' in update_fields:
+            self.update_summary()
+            if update_fields is not None:
+                update_fields = {*update_fields, *self.SUMMARY_FIELDS}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class News(NewsFields):
+    """Represents a news article or announcement."""
+
+    class Meta(NewsFields.Meta):
+        verbose_name = "News"
+        verbose_name_plural = "News"
+        indexes = [
+            models.Index(fields=['-created_at'], condition=ACTIVE, name='news_active_created_idx'),
+        ]
+
+
+class ArchivedNews(NewsFields):
+    """News moved out of ``News`` by ``core.archive``; keeps its original id."""
+    # Copied from the live row, not set on insert.
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta(NewsFields.Meta):
+        verbose_name = "Archived News"
+        verbose_name_plural = "Archived News"
+        indexes = [
+            models.Index(fields=['-created_at'], condition=ACTIVE, name='news_archive_created_idx'),
+        ]
+
 
 def month_hero_image_path(instance, filename):
     """Generate custom path for month hero images."""
@@ -83,29 +167,214 @@ def month_hero_image_path(instance, filename):
     return f'users/{new_filename}'
 
 
-class MonthHero(models.Model):
-    """
-    Represents a 'Hero of the Month' — either a student or a teacher
-    recognized for achievements in a specific month.
-    """
+class MonthHeroFields(models.Model):
+    """Columns and behaviour shared by ``MonthHero`` and ``ArchivedMonthHero``."""
     HERO_TYPE_CHOICES = [
         ('student', 'Student'),
         ('teacher', 'Teacher'),
     ]
 
-    month = models.ForeignKey(Month, on_delete=models.CASCADE, related_name='heroes')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='month_heroes')
     type = models.CharField(max_length=20, choices=HERO_TYPE_CHOICES)
     image = models.ImageField(upload_to=month_hero_image_path, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TrackedQuerySet.as_manager()
 
     class Meta:
+        abstract = True
         ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_type_display()} - {self.user.username} ({self.month.name})"
+
+
+class MonthHero(MonthHeroFields):
+    """
+    Represents a 'Hero of the Month' — either a student or a teacher
+    recognized for achievements in a specific month.
+    """
+    month = models.ForeignKey(Month, on_delete=models.CASCADE, related_name='heroes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='month_heroes')
+
+    class Meta(MonthHeroFields.Meta):
         verbose_name = "Month Hero"
         verbose_name_plural = "Month Heroes"
         unique_together = ('month', 'user', 'type')
+        indexes = [
+            models.Index(fields=['-created_at'], condition=ACTIVE, name='hero_active_created_idx'),
+            models.Index(fields=['month', '-created_at'], condition=ACTIVE, name='hero_month_idx'),
+            models.Index(fields=['type', '-created_at'], condition=ACTIVE, name='hero_type_idx'),
+            models.Index(fields=['user', '-created_at'], condition=ACTIVE, name='hero_user_idx'),
+        ]
+
+
+class ArchivedMonthHero(MonthHeroFields):
+    """Hero of a closed month moved out of ``MonthHero`` by ``core.archive``; keeps its original id."""
+    month = models.ForeignKey(Month, on_delete=models.CASCADE, related_name='archived_heroes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_month_heroes')
+    # Copied from the live row, not set on insert.
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta(MonthHeroFields.Meta):
+        verbose_name = "Archived Month Hero"
+        verbose_name_plural = "Archived Month Heroes"
+        indexes = [
+            models.Index(fields=['-created_at'], condition=ACTIVE, name='hero_archive_created_idx'),
+            models.Index(fields=['month', '-created_at'], condition=ACTIVE, name='hero_archive_month_idx'),
+            models.Index(fields=['user', '-created_at'], condition=ACTIVE, name='hero_archive_user_idx'),
+        ]
+
+
+class Tombstone(models.Model):
+    """Deletion log read by the delta-sync API (``?since=``)."""
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-deleted_at']
+        verbose_name = "Tombstone"
+        verbose_name_plural = "Tombstones"
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}"
+
+
+class UserSearchTerm(models.Model):
+    """Lower-cased word of a user's username, name or email, for prefix search."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        verbose_name = "User Search Term"
+        verbose_name_plural = "User Search Terms"
+        indexes = [
+            models.Index(fields=['term', 'user'], name='user_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class UserSearchTrigram(models.Model):
+    """Three-character slice of a user's search terms, for substring search."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        verbose_name = "User Search Trigram"
+        verbose_name_plural = "User Search Trigrams"
+        indexes = [
+            models.Index(fields=['trigram', 'user'], name='user_search_trigram_idx'),
+        ]
+
+    def __str__(self):
+        return self.trigram
+
+
+class HeroCountFields(models.Model):
+    """Active heroes (live and archived) counted by type; maintained by ``core.stats``."""
+    students = models.PositiveIntegerField(default=0)
+    teachers = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    last_awarded_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+
+
+class UserHeroStats(HeroCountFields):
+    """Hero counts of one user, for the leaderboard."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='hero_stats')
+
+    class Meta:
+        verbose_name = "User Hero Stats"
+        verbose_name_plural = "User Hero Stats"
+        indexes = [
+            models.Index(fields=['-total', 'user'], name='stats_user_total_idx'),
+            models.Index(fields=['-students', 'user'], name='stats_user_students_idx'),
+            models.Index(fields=['-teachers', 'user'], name='stats_user_teachers_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total}"
+
+
+class MonthHeroStats(HeroCountFields):
+    """Hero counts of one month."""
+    month = models.OneToOneField(Month, on_delete=models.CASCADE, primary_key=True, related_name='hero_stats')
+
+    class Meta:
+        verbose_name = "Month Hero Stats"
+        verbose_name_plural = "Month Hero Stats"
+
+    def __str__(self):
+        return f"{self.month_id}: {self.total}"
+
+
+class HeroTimelineStats(HeroCountFields):
+    """Heroes awarded in one calendar month (``period`` is its first day)."""
+    period = models.DateField(primary_key=True)
+
+    class Meta:
+        ordering = ['period']
+        verbose_name = "Hero Timeline Stats"
+        verbose_name_plural = "Hero Timeline Stats"
+
+    def __str__(self):
+        return f"{self.period:%Y-%m}: {self.total}"
+
+
+class Job(models.Model):
+    """Background task queued by the admin and run by ``manage.py run_worker``."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Earliest start for queued jobs (retry back-off); for running jobs,
+    # ``locked_until`` is when another worker may take the job over.
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.get_type_display()} - {self.user.username} ({self.month.name})"
\ No newline at end of file
+        return f"{self.task} #{self.pk}"
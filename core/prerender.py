@@ -0,0 +1,264 @@
+"""
+Pre-rendering of the public API to static files.
+
+Every list page and detail document of the routes in ``core.urls`` is written
+under ``PRERENDER_ROOT`` as JSON with ``.gz`` and ``.br`` siblings:
+
+    api/index.json                  /api/
+    api/news/index.json             /api/news/   (and ?page=1)
+    api/news/page-2.json            /api/news/?page=2
+    api/news/42/index.json          /api/news/42/
+    api/months/current/index.json   /api/months/current/
+
+so nginx can answer without touching Python. The files only hold the
+unfiltered JSON pages: ``try_files`` ignores the query string and the Accept
+header, so requests with any argument other than ``page`` (``?since=``,
+``?ids=``, ``?archive=1``, filters, search) or asking for another format
+(``Accept: application/msgpack``) must go to Django, e.g.::
+
+    map $args $prerender_args {
+        ""                              1;
+        "~^page=\\d+$"                   1;
+        default                         0;
+    }
+    map $http_accept $prerender_accept {
+        ""                              1;
+        "~application/msgpack"          0;
+        "~^\\*/\\*$|application/json"     1;
+        default                         0;
+    }
+    map "$prerender_args$prerender_accept" $prerendered {
+        "11"                            1;
+        default                         0;
+    }
+
+    location /api/ {
+        error_page 418 = @django;
+        if ($prerendered = 0) { return 418; }
+        root /srv/prerendered;
+        gzip_static on; brotli_static on;
+        default_type application/json;
+        set $prerendered_file ${uri}index.json;
+        if ($arg_page ~ ^([2-9]|[1-9]\\d+)$) { set $prerendered_file ${uri}page-$arg_page.json; }
+        try_files $prerendered_file @django;
+    }
+
+Files are replaced with atomic renames and only rewritten when their bytes
+change. Builds are incremental: the manifest records when the last build
+started, and a resource is only re-rendered if the delta-sync probe
+(``core.sync.changes_since``) reports changes since then.
+"""
+import fcntl
+import gzip
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import brotli
+from django.conf import settings
+from django.db import connections, transaction
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from . import sync
+
+MANIFEST = '.manifest.json'
+
+# List actions rendered in addition to the router's list and detail routes.
+EXTRA_PATHS = {
+    'months': ['current'],
+}
+
+
+class InternalClient:
+    """Renders API paths in-process as if requested from ``base_url``."""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.secure = url.scheme == 'https'
+        self.factory = APIRequestFactory(
+            SERVER_NAME=url.hostname,
+            SERVER_PORT=str(url.port or (443 if self.secure else 80)),
+        )
+
+    def request(self, path, params=None):
+        """An unthrottled JSON GET of ``path``."""
+        request = self.factory.get(path, params or {}, secure=self.secure, HTTP_ACCEPT='application/json')
+        request.throttle_exempt = True
+        return request
+
+    def render(self, path, params=None):
+        """Return ``(status, body)`` for a GET of ``path``."""
+        request = self.request(path, params)
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response.status_code, response.content
+
+
+class Prerenderer(InternalClient):
+    """Renders API paths in-process and writes them under ``root``."""
+
+    def __init__(self, root, base_url, stdout=None):
+        super().__init__(base_url)
+        self.root = str(root)
+        self.stdout = stdout
+        self.written = 0
+        self.unchanged = 0
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def write(self, relpath, body):
+        """Atomically write ``relpath`` and its compressed siblings if changed."""
+        target = os.path.join(self.root, relpath)
+        try:
+            with open(target, 'rb') as f:
+                if f.read() == body:
+                    self.unchanged += 1
+                    return
+        except FileNotFoundError:
+            pass
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        variants = [
+            ('.gz', gzip.compress(body, compresslevel=9, mtime=0)),
+            ('.br', brotli.compress(body, quality=11)),
+            # The plain file goes last: it is the one compared on the next build.
+            ('', body),
+        ]
+        for suffix, content in variants:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target + suffix)
+        self.written += 1
+
+    def remove(self, reldir):
+        shutil.rmtree(os.path.join(self.root, reldir), ignore_errors=True)
+
+    def remove_pages_after(self, prefix, last_page):
+        directory = os.path.join(self.root, 'api', prefix)
+        for name in os.listdir(directory):
+            page = name.split('.')[0].removeprefix('page-')
+            if name.startswith('page-') and page.isdigit() and int(page) > last_page:
+                os.remove(os.path.join(directory, name))
+
+    def build_root(self):
+        status, body = self.render('/api/')
+        if status == 200:
+            self.write('api/index.json', body)
+
+    def build_resource(self, prefix, viewset, since=None):
+        """Render ``prefix``'s list pages and details; only changed details if ``since``."""
+        model = viewset.queryset.model
+        changed = None
+        if since is not None:
+            updated_pks, deleted_pks = sync.changes_since(model, since)
+            if not updated_pks and not deleted_pks:
+                return
+            changed = updated_pks
+            for pk in deleted_pks:
+                self.remove(f'api/{prefix}/{pk}')
+
+        self.log(f"Rendering /api/{prefix}/")
+        status, body = self.render(f'/api/{prefix}/')
+        if status != 200:
+            return
+        self.write(f'api/{prefix}/index.json', body)
+        pages = max(1, math.ceil(json.loads(body).get('count', 0) / settings.REST_FRAMEWORK['PAGE_SIZE']))
+        for page in range(1, pages + 1):
+            if page > 1:
+                status, body = self.render(f'/api/{prefix}/', {'page': page})
+            self.write(f'api/{prefix}/page-{page}.json', body)
+        self.remove_pages_after(prefix, pages)
+        for name in EXTRA_PATHS.get(prefix, ()):
+            status, body = self.render(f'/api/{prefix}/{name}/')
+            if status == 200:
+                self.write(f'api/{prefix}/{name}/index.json', body)
+            else:
+                self.remove(f'api/{prefix}/{name}')
+
+        details = viewset.queryset
+        if since is not None:
+            details = details.filter(updated_at__gt=since)
+        visible = set(details.values_list('pk', flat=True))
+        for pk in visible:
+            status, body = self.render(f'/api/{prefix}/{pk}/')
+            if status == 200:
+                self.write(f'api/{prefix}/{pk}/index.json', body)
+
+        if changed is not None:
+            # Changed objects that left the listing (deactivated) lose their file.
+            stale = changed - visible
+        else:
+            directory = os.path.join(self.root, 'api', prefix)
+            stale = {int(name) for name in os.listdir(directory) if name.isdigit()} - visible
+        for pk in stale:
+            self.remove(f'api/{prefix}/{pk}')
+
+
+def build(full=False, stdout=None):
+    """Incrementally (or, with ``full``, completely) rebuild ``PRERENDER_ROOT``."""
+    from .urls import router
+
+    root = str(settings.PRERENDER_ROOT)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest_path = os.path.join(root, MANIFEST)
+        since = None
+        if not full:
+            try:
+                with open(manifest_path) as f:
+                    since = datetime.fromisoformat(json.load(f)['started_at'])
+            except (FileNotFoundError, KeyError, ValueError):
+                since = None
+        # Overlap with the previous build so late commits are not missed.
+        started_at = timezone.now() - timedelta(seconds=settings.SYNC_TOKEN_MARGIN_SECONDS)
+
+        prerenderer = Prerenderer(root, settings.PRERENDER_BASE_URL, stdout=stdout)
+        prerenderer.build_root()
+        for prefix, viewset, basename in router.registry:
+            if viewset.prerendered:
+                prerenderer.build_resource(prefix, viewset, since=since)
+
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump({'started_at': started_at.isoformat()}, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+    return prerenderer
+
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _run_scheduled_build():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        build()
+    finally:
+        connections.close_all()
+
+
+def schedule_build():
+    """Debounced incremental rebuild in a background thread, after commit."""
+    def start():
+        global _timer
+        with _timer_lock:
+            if _timer is None:
+                _timer = threading.Timer(settings.PRERENDER_DEBOUNCE_SECONDS, _run_scheduled_build)
+                _timer.daemon = True
+                _timer.start()
+    transaction.on_commit(start)
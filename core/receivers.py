@@ -0,0 +1,274 @@
+"""
+Signal receivers that keep caches and derived data in sync with the models.
+
+Imported from ``CoreConfig.ready()``.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cdn, events, fragments, prerender, refdata, search, stats, warming
+from .cache import model_stamp
+from .models import ArchivedMonthHero, ArchivedNews, Month, MonthHero, Mentor, Direction, News, Tombstone
+from .signals import bulk_updated
+from .views import current_month_cache
+
+PUBLIC_MODELS = (Month, MonthHero, Mentor, Direction, News, User)
+SYNCED_MODELS = (Month, MonthHero, Mentor, Direction, News)
+EVENT_TOPICS = {News: 'news', MonthHero: 'hero'}
+# Served by id and with ?archive=1, and edited in the admin.
+ARCHIVE_MODELS = (ArchivedMonthHero, ArchivedNews)
+
+
+def chunked(items, size=500):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def purge_edge_cache(sender, instance, update_fields=None, **kwargs):
+    if update_fields == {'last_login'}:
+        return
+    if sender in PUBLIC_MODELS or sender in ARCHIVE_MODELS:
+        cdn.purge_instance(instance)
+
+
+@receiver(bulk_updated)
+def purge_edge_cache_bulk(sender, pks, **kwargs):
+    if sender in PUBLIC_MODELS or sender in ARCHIVE_MODELS:
+        cdn.purge_pks(sender, pks)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_current_month(sender, instance, created=False, update_fields=None, **kwargs):
+    if sender in (Month, MonthHero):
+        current_month_cache.invalidate()
+    elif sender is User and not created and update_fields != {'last_login'}:
+        current_month_cache.invalidate()
+
+
+@receiver(bulk_updated)
+def invalidate_current_month_bulk(sender, **kwargs):
+    if sender in (Month, MonthHero, User):
+        current_month_cache.invalidate()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_lists(sender, instance, created=False, update_fields=None, **kwargs):
+    if sender is User and (created or update_fields == {'last_login'}):
+        return
+    if sender in PUBLIC_MODELS or sender in ARCHIVE_MODELS:
+        model_stamp(sender).bump_on_commit()
+
+
+@receiver(bulk_updated)
+def invalidate_cached_lists_bulk(sender, **kwargs):
+    if sender in PUBLIC_MODELS or sender in ARCHIVE_MODELS:
+        model_stamp(sender).bump_on_commit()
+
+
+@receiver(post_save, sender=User)
+def index_user_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields != {'last_login'}:
+        search.index_users([instance.pk])
+
+
+@receiver(bulk_updated, sender=News)
+def summarize_bulk_updated_news(sender, pks, fields, **kwargs):
+    if 'content' not in fields:
+        return
+    for batch in chunked(pks):
+        news = list(News._base_manager.filter(pk__in=batch).only('pk', 'content'))
+        for item in news:
+            item.update_summary()
+        News._base_manager.bulk_update(news, News.SUMMARY_FIELDS)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(bulk_updated)
+def invalidate_reference_data(sender, **kwargs):
+    table = refdata.TABLES.get(sender)
+    if table is not None:
+        table.invalidate()
+
+
+# Registered after invalidate_reference_data: fragments are deleted only once
+# workers can see the new directions and months.
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_fragments(sender, instance, created=False, update_fields=None, **kwargs):
+    if sender is User and (created or update_fields == {'last_login'}):
+        return
+    if sender in PUBLIC_MODELS:
+        fragments.invalidate(sender, [instance.pk])
+
+
+@receiver(bulk_updated)
+def invalidate_fragments_bulk(sender, pks, **kwargs):
+    if sender in PUBLIC_MODELS:
+        for batch in chunked(pks):
+            fragments.invalidate(sender, batch)
+
+
+@receiver(post_delete)
+def record_tombstone(sender, instance, **kwargs):
+    if sender in SYNCED_MODELS:
+        Tombstone.objects.create(model=sender._meta.label_lower, object_id=instance.pk)
+
+
+def touch_parents(model, pks):
+    """
+    Bump ``updated_at`` on the objects that embed ``model`` rows in their
+    representation (months embed heroes, directions embed mentors, heroes
+    embed users), so delta sync reports them as changed.
+    """
+    now = timezone.now()
+    for batch in chunked(pks):
+        if model is MonthHero:
+            months = MonthHero._base_manager.filter(pk__in=batch).values('month_id')
+            Month._base_manager.filter(pk__in=months).update(updated_at=now)
+        elif model is Mentor:
+            directions = Mentor._base_manager.filter(pk__in=batch).values('direction_id')
+            Direction._base_manager.filter(pk__in=directions).update(updated_at=now)
+        elif model is User:
+            heroes = MonthHero._base_manager.filter(user_id__in=batch)
+            Month._base_manager.filter(pk__in=heroes.values('month_id')).update(updated_at=now)
+            heroes.update(updated_at=now)
+
+
+def touch_children(model, pks):
+    """
+    Bump ``updated_at`` on the objects embedding fields of ``model`` rows
+    (heroes embed their month's name, mentors their direction's title), so
+    delta sync and the incremental prerender pick up renames.
+    """
+    now = timezone.now()
+    for batch in chunked(pks):
+        if model is Month:
+            MonthHero._base_manager.filter(month_id__in=batch).update(updated_at=now)
+            ArchivedMonthHero._base_manager.filter(month_id__in=batch).update(updated_at=now)
+        elif model is Direction:
+            Mentor._base_manager.filter(direction_id__in=batch).update(updated_at=now)
+
+
+@receiver(post_save)
+def touch_parents_on_save(sender, instance, created=False, update_fields=None, **kwargs):
+    if sender is User and (created or update_fields == {'last_login'}):
+        return
+    if sender in (MonthHero, Mentor, User):
+        touch_parents(sender, [instance.pk])
+    elif sender in (Month, Direction) and not created:
+        touch_children(sender, [instance.pk])
+
+
+@receiver(post_delete)
+def touch_parents_on_delete(sender, instance, **kwargs):
+    # The row is gone, so update the parent directly.
+    now = timezone.now()
+    if sender is MonthHero:
+        Month._base_manager.filter(pk=instance.month_id).update(updated_at=now)
+    elif sender is Mentor and instance.direction_id:
+        Direction._base_manager.filter(pk=instance.direction_id).update(updated_at=now)
+
+
+@receiver(bulk_updated)
+def touch_parents_bulk(sender, pks, **kwargs):
+    if sender in (MonthHero, Mentor, User):
+        touch_parents(sender, pks)
+    elif sender in (Month, Direction):
+        touch_children(sender, pks)
+
+
+@receiver(post_save)
+def publish_change_event(sender, instance, created=False, **kwargs):
+    topic = EVENT_TOPICS.get(sender)
+    if topic:
+        if created:
+            action = 'created'
+        else:
+            action = 'updated' if instance.is_active else 'deactivated'
+        events.publish(topic, action, [instance.pk])
+
+
+@receiver(post_delete)
+def publish_delete_event(sender, instance, **kwargs):
+    topic = EVENT_TOPICS.get(sender)
+    if topic:
+        events.publish(topic, 'deleted', [instance.pk])
+
+
+@receiver(bulk_updated)
+def publish_bulk_change_events(sender, pks, fields, **kwargs):
+    topic = EVENT_TOPICS.get(sender)
+    if not topic:
+        return
+    if 'is_active' not in fields:
+        events.publish(topic, 'updated', pks)
+        return
+    active, inactive = [], []
+    for batch in chunked(pks):
+        for pk, is_active in sender._base_manager.filter(pk__in=batch).values_list('pk', 'is_active'):
+            (active if is_active else inactive).append(pk)
+    if active:
+        events.publish(topic, 'updated', active)
+    if inactive:
+        events.publish(topic, 'deactivated', inactive)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(bulk_updated)
+def rebuild_prerendered_api(sender, **kwargs):
+    if settings.PRERENDER_ON_SAVE and sender in SYNCED_MODELS:
+        prerender.schedule_build()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(bulk_updated)
+def rewarm_api_cache(sender, update_fields=None, **kwargs):
+    if sender in PUBLIC_MODELS and update_fields != {'last_login'}:
+        warming.schedule_warm_on_commit()
+
+
+# Fields that move a hero to other rollup keys; their old values are gone
+# after a bulk update, so such updates recount everything.
+STATS_KEY_FIELDS = {'user', 'user_id', 'month', 'month_id', 'created_at'}
+
+
+@receiver(pre_save)
+def remember_hero_stats_keys(sender, instance, **kwargs):
+    if sender in stats.SOURCES and instance.pk is not None:
+        instance._stats_previous = list(
+            sender._base_manager.filter(pk=instance.pk).only('user_id', 'month_id', 'created_at')
+        )
+
+
+@receiver(post_save)
+def refresh_hero_stats(sender, instance, **kwargs):
+    if sender in stats.SOURCES:
+        stats.refresh_heroes([instance, *getattr(instance, '_stats_previous', ())])
+
+
+@receiver(post_delete)
+def refresh_hero_stats_on_delete(sender, instance, **kwargs):
+    if sender in stats.SOURCES:
+        stats.refresh_heroes([instance])
+
+
+@receiver(bulk_updated)
+def refresh_hero_stats_bulk(sender, pks, fields, **kwargs):
+    if sender not in stats.SOURCES:
+        return
+    if fields & STATS_KEY_FIELDS:
+        stats.rebuild()
+        return
+    for batch in chunked(pks):
+        stats.refresh_heroes(sender._base_manager.filter(pk__in=batch).only('user_id', 'month_id', 'created_at'))
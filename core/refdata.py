@@ -0,0 +1,72 @@
+"""
+Process-local cache of the small reference tables (directions, months).
+
+Each ``ReferenceTable`` loads every row of its model once per worker and
+serves lookups from memory. Changes bump the table's ``VersionStamp`` after
+commit (``core.receivers``), and a worker reloads when it sees the stamp
+move. Inside a request the stamp is checked at most once
+(``core.middleware.ReferenceDataMiddleware``); outside requests every
+lookup checks it, which costs one ``stat()``.
+
+Cached instances are shared between threads: treat them as read-only.
+"""
+import threading
+
+from .cache import VersionStamp
+from .models import Direction, Month
+
+_request = threading.local()
+
+
+def begin_request():
+    _request.checked = set()
+
+
+def end_request():
+    _request.__dict__.pop('checked', None)
+
+
+class ReferenceTable:
+    """All rows of ``model`` in memory, keyed by primary key."""
+
+    def __init__(self, model):
+        self.model = model
+        self.name = f'refdata-{model._meta.label_lower}'
+        self.stamp = VersionStamp(self.name)
+        self._lock = threading.Lock()
+        self._version = None
+        self._rows = None
+
+    def _current(self):
+        checked = getattr(_request, 'checked', None)
+        if checked is not None and self.name in checked and self._rows is not None:
+            return self._rows
+        version = self.stamp.get()
+        if self._rows is None or version != self._version:
+            with self._lock:
+                if self._rows is None or version != self._version:
+                    self._rows = {obj.pk: obj for obj in self.model._base_manager.order_by(*self.model._meta.ordering)}
+                    self._version = version
+        if checked is not None:
+            checked.add(self.name)
+        return self._rows
+
+    def get(self, pk, default=None):
+        """The ``model`` instance with primary key ``pk``, or ``default``."""
+        return self._current().get(pk, default)
+
+    def all(self):
+        """Every row, in the model's default ordering."""
+        return list(self._current().values())
+
+    def active(self):
+        return [obj for obj in self.all() if obj.is_active]
+
+    def invalidate(self):
+        self.stamp.bump_on_commit()
+
+
+directions = ReferenceTable(Direction)
+months = ReferenceTable(Month)
+
+TABLES = {Direction: directions, Month: months}
@@ -0,0 +1,106 @@
+import datetime
+import decimal
+import uuid
+
+import msgpack
+import orjson
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class RawJSON:
+    """
+    Already-serialized JSON that renderers embed verbatim.
+
+    Encoders that cannot embed raw JSON, such as DRF's ``JSONEncoder`` behind
+    the stock ``JSONRenderer`` and the browsable API, pick up ``tolist()`` and
+    encode the decoded value instead.
+    """
+    __slots__ = ('json',)
+
+    def __init__(self, json):
+        self.json = bytes(json)
+
+    def __len__(self):
+        return len(self.json)
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and other.json == self.json
+
+    __hash__ = None
+
+    def tolist(self):
+        return orjson.loads(self.json)
+
+
+def _default(obj):
+    """Fallback for types orjson does not handle natively."""
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.json)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Datetimes, dates, UUIDs and dataclasses are encoded natively; anything
+    else goes through DRF's encoder, so the output matches ``JSONRenderer``.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=self.options)
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """Newline-delimited JSON: one document per line (``/export/`` endpoints)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+
+
+def ndjson(items):
+    """Encode ``items`` as newline-delimited JSON."""
+    options = NDJSONRenderer.options
+    return b''.join(orjson.dumps(item, default=_default, option=options) for item in items)
+
+
+def _msgpack_default(obj):
+    """Fallback for types msgpack does not handle natively."""
+    if isinstance(obj, RawJSON):
+        return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (str, decimal.Decimal, uuid.UUID, Promise)):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, (list, tuple)):
+        return list(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Compact binary rendering, selected with ``Accept: application/msgpack``."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, strict_types=True)
@@ -0,0 +1,122 @@
+"""
+Indexed user search for the admin autocomplete.
+
+Every user has one ``UserSearchTerm`` row per lower-cased word of their
+username, first and last name and email, plus ``UserSearchTrigram`` rows for
+the three-character slices of those words (email domains excluded: almost
+everyone shares them). A query matches a user when each of its words is a
+prefix of one of the user's terms, which is a range scan on
+``user_search_term_idx``. Words of three or more characters that match no
+prefix fall back to the trigram index, so ``"ohn"`` still finds ``john``.
+
+The admin autocomplete reads at most ``AUTOCOMPLETE_LIMIT`` candidates.
+Rows are rebuilt for a user whenever it is saved (``core.receivers``);
+``manage.py rebuild_user_search`` rebuilds everything.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import UserSearchTerm, UserSearchTrigram
+
+WORD = re.compile(r'[^\W_]+')
+TERM_MAX_LENGTH = 64
+# Upper bound on the code point of any character, for prefix range scans.
+MAX_CHAR = '\U0010ffff'
+AUTOCOMPLETE_LIMIT = 100
+
+
+def words(text):
+    return [word[:TERM_MAX_LENGTH] for word in WORD.findall((text or '').casefold())]
+
+
+def user_terms(username, first_name, last_name, email):
+    """Return ``(terms, trigrams)`` for a user's searchable fields."""
+    local_part, _, domain = (email or '').partition('@')
+    named = set(words(username) + words(first_name) + words(last_name) + words(local_part))
+    terms = named | set(words(domain))
+    trigrams = {word[i:i + 3] for word in named for i in range(len(word) - 2)}
+    return terms, trigrams
+
+
+def index_users(pks):
+    """Rebuild the search rows of the users ``pks``."""
+    pks = list(pks)
+    UserSearchTerm.objects.filter(user_id__in=pks).delete()
+    UserSearchTrigram.objects.filter(user_id__in=pks).delete()
+    term_rows, trigram_rows = [], []
+    users = User.objects.filter(pk__in=pks).values_list('pk', 'username', 'first_name', 'last_name', 'email')
+    for pk, *fields in users:
+        terms, trigrams = user_terms(*fields)
+        term_rows.extend(UserSearchTerm(user_id=pk, term=term) for term in terms)
+        trigram_rows.extend(UserSearchTrigram(user_id=pk, trigram=trigram) for trigram in trigrams)
+    UserSearchTerm.objects.bulk_create(term_rows, batch_size=1000)
+    UserSearchTrigram.objects.bulk_create(trigram_rows, batch_size=1000)
+
+
+def rebuild_index(batch_size=2000, progress=None):
+    """
+    Rebuild the search rows of every user, one transaction per batch, and
+    return the number of users; ``progress(done, total)`` follows each batch.
+    """
+    total = User.objects.count()
+    done = last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return done
+        with transaction.atomic():
+            index_users(batch)
+        done += len(batch)
+        last_pk = batch[-1]
+        if progress is not None:
+            progress(done, total)
+
+
+def prefix_matches(word):
+    return UserSearchTerm.objects.filter(term__gte=word, term__lt=word + MAX_CHAR).values('user_id')
+
+
+def trigram_matches(word):
+    """Users having every trigram of ``word`` (a superset of substring matches)."""
+    trigrams = {word[i:i + 3] for i in range(len(word) - 2)}
+    return (
+        UserSearchTrigram.objects.filter(trigram__in=trigrams)
+        .values('user_id')
+        .annotate(matched=Count('trigram', distinct=True))
+        .filter(matched=len(trigrams))
+        .values('user_id')
+    )
+
+
+def search_users(queryset, query, limit=None):
+    """
+    Filter ``queryset`` to users matching every word of ``query``.
+
+    With ``limit`` (autocomplete), and when every word has prefix matches,
+    candidates are read from the term index for the longest word in term
+    order, checked against the other words and cut off at ``limit``, so broad
+    queries like ``"a"`` stop early instead of collecting every match.
+    """
+    query_words = words(query)
+    if limit and query_words and all(prefix_matches(word).exists() for word in query_words):
+        driver = max(query_words, key=len)
+        candidates = UserSearchTerm.objects.filter(term__gte=driver, term__lt=driver + MAX_CHAR)
+        # The remaining words are checked per candidate through the user_id index.
+        for word in query_words:
+            if word != driver:
+                candidates = candidates.filter(Exists(
+                    UserSearchTerm.objects.filter(user=OuterRef('user_id'), term__gte=word, term__lt=word + MAX_CHAR)
+                ))
+        return queryset.filter(pk__in=candidates.order_by('term', 'user_id').values('user_id')[:limit])
+    for word in query_words:
+        if len(word) >= 3 and not prefix_matches(word).exists():
+            contains = Q()
+            for field in ('username', 'first_name', 'last_name', 'email'):
+                contains |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(contains, pk__in=trigram_matches(word))
+        else:
+            queryset = queryset.filter(pk__in=prefix_matches(word))
+    return queryset
@@ -1,6 +1,17 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
-from .models import Month, MonthHero, Mentor, Direction, News
+from .models import (
+    Month, MonthHero, Mentor, Direction, News, UserHeroStats, MonthHeroStats, HeroTimelineStats
+)
+from .refdata import directions, months
+
+
+def child_list_url(view_name, field, pk, context):
+    """The list endpoint ``view_name`` filtered to the children of ``pk``."""
+    return replace_query_param(reverse(view_name, request=context.get('request')), field, pk)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,7 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 class MonthHeroSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
-    month_name = serializers.CharField(source='month.name', read_only=True)
+    month_name = serializers.SerializerMethodField()
 
     class Meta:
         model = MonthHero
@@ -23,18 +34,44 @@ class MonthHeroSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_month_name(self, obj):
+        month = months.get(obj.month_id)
+        return month.name if month else None
+
 
 class MonthSerializer(serializers.ModelSerializer):
-    heroes = MonthHeroSerializer(many=True, read_only=True)
+    """
+    A month with its latest ``API_NESTED_LIMIT`` heroes, their total and a
+    link to the rest. Expects the ``hero_count`` annotation and the capped
+    prefetch of ``MonthViewSet``.
+    """
+    heroes = serializers.SerializerMethodField()
+    hero_count = serializers.SerializerMethodField()
+    heroes_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Month
-        fields = ['id', 'name', 'description', 'is_active', 'heroes', 'created_at']
+        fields = ['id', 'name', 'description', 'is_active', 'heroes', 'hero_count', 'heroes_url', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+    def get_heroes(self, obj):
+        heroes = obj.nested_heroes
+        if self.context.get('archived_heroes'):
+            heroes = sorted([*heroes, *obj.nested_archived_heroes], key=lambda hero: hero.created_at, reverse=True)
+            heroes = heroes[:settings.API_NESTED_LIMIT]
+        return MonthHeroSerializer(heroes, many=True, context=self.context).data
+
+    def get_hero_count(self, obj):
+        if self.context.get('archived_heroes'):
+            return obj.hero_count + obj.archived_hero_count
+        return obj.hero_count
+
+    def get_heroes_url(self, obj):
+        return child_list_url('hero-list', 'month', obj.pk, self.context)
+
 
 class MentorSerializer(serializers.ModelSerializer):
-    direction_title = serializers.CharField(source='direction.title', read_only=True, allow_null=True)
+    direction_title = serializers.SerializerMethodField()
 
     class Meta:
         model = Mentor
@@ -44,24 +81,94 @@ class MentorSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_direction_title(self, obj):
+        direction = directions.get(obj.direction_id)
+        return direction.title if direction else None
+
 
 class DirectionSerializer(serializers.ModelSerializer):
-    mentors = MentorSerializer(many=True, read_only=True)
+    """
+    A direction with its first ``API_NESTED_LIMIT`` mentors by name, their
+    total and a link to the rest (see ``DirectionViewSet``).
+    """
+    mentors = MentorSerializer(source='nested_mentors', many=True, read_only=True)
+    mentor_count = serializers.IntegerField(read_only=True)
+    mentors_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Direction
         fields = [
-            'id', 'title', 'description',
-            'is_active', 'mentors', 'created_at'
+            'id', 'title', 'description', 'is_active',
+            'mentors', 'mentor_count', 'mentors_url', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_mentors_url(self, obj):
+        return child_list_url('mentor-list', 'direction', obj.pk, self.context)
+
 
 class NewsSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(source='content_html', read_only=True)
+
     class Meta:
         model = News
         fields = [
-            'id', 'title', 'content',
+            'id', 'title', 'content', 'excerpt', 'word_count',
             'image', 'is_active', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+
+class NewsListSerializer(serializers.ModelSerializer):
+    """News in listings: the plain-text excerpt instead of the HTML body."""
+
+    class Meta:
+        model = News
+        fields = [
+            'id', 'title', 'excerpt', 'word_count',
+            'image', 'is_active', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_at']
+
+
+class CurrentMonthSerializer(serializers.ModelSerializer):
+    """The active month with its active heroes grouped by type."""
+    heroes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Month
+        fields = ['id', 'name', 'description', 'is_active', 'heroes', 'created_at']
+
+    def get_heroes(self, obj):
+        grouped = {hero_type: [] for hero_type, _ in MonthHero.HERO_TYPE_CHOICES}
+        heroes = MonthHeroSerializer(obj.active_heroes, many=True, context=self.context).data
+        for hero in heroes:
+            grouped.setdefault(hero['type'], []).append(hero)
+        return grouped
+
+
+class UserHeroStatsSerializer(serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = UserHeroStats
+        fields = ['user', 'students', 'teachers', 'total', 'last_awarded_at']
+
+
+class MonthHeroStatsSerializer(serializers.ModelSerializer):
+    month_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MonthHeroStats
+        fields = ['month', 'month_name', 'students', 'teachers', 'total', 'last_awarded_at']
+
+    def get_month_name(self, obj):
+        month = months.get(obj.month_id)
+        return month.name if month else None
+
+
+class HeroTimelineStatsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = HeroTimelineStats
+        fields = ['period', 'students', 'teachers', 'total', 'last_awarded_at']
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by ``TrackedQuerySet.update()`` after a bulk UPDATE, with ``pks`` (the
+# affected primary keys) and ``fields`` (the names of the updated fields).
+# Model signals are not sent for bulk updates, so listeners that keep derived
+# state in sync must handle this signal as well.
+bulk_updated = Signal()
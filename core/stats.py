@@ -0,0 +1,118 @@
+"""
+Hero statistics for ``/api/stats/``, kept in rollup tables.
+
+``UserHeroStats``, ``MonthHeroStats`` and ``HeroTimelineStats`` count the
+active heroes, live and archived, per user, per month and per calendar month
+of award, split by type. When heroes are saved, deleted or bulk updated,
+``core.receivers`` has the rows of the affected users, months and periods
+recounted from those heroes only (index range scans), so the cost of an
+update does not grow with history. Keys are recounted rather than adjusted by
+deltas, so a missed change is fixed by the next one touching the same keys.
+``manage.py rebuild_hero_stats`` recounts everything.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, DateField, Max, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .cache import model_stamp
+from .models import ArchivedMonthHero, HeroTimelineStats, MonthHero, MonthHeroStats, UserHeroStats
+
+SOURCES = (MonthHero, ArchivedMonthHero)
+TYPE_FIELDS = {'student': 'students', 'teacher': 'teachers'}
+COUNT_FIELDS = ['students', 'teachers', 'total', 'last_awarded_at']
+
+# Rollup model, its key field and the hero value it is keyed by.
+ROLLUPS = {
+    'user': (UserHeroStats, 'user_id'),
+    'month': (MonthHeroStats, 'month_id'),
+    'period': (HeroTimelineStats, 'period'),
+}
+
+
+def period_of(created_at):
+    """First day of the local calendar month of ``created_at``."""
+    return timezone.localtime(created_at).date().replace(day=1)
+
+
+def period_range(period):
+    start = timezone.make_aware(datetime.datetime.combine(period, datetime.time.min))
+    following = (period + datetime.timedelta(days=32)).replace(day=1)
+    return start, timezone.make_aware(datetime.datetime.combine(following, datetime.time.min))
+
+
+def hero_keys(hero):
+    """Rollup keys a hero counts towards."""
+    return {'user': hero.user_id, 'month': hero.month_id, 'period': period_of(hero.created_at)}
+
+
+def count(kind, keys=None):
+    """Active hero counts per key of ``kind``, for ``keys`` or every key."""
+    q = Q()
+    if keys is not None and kind == 'period':
+        q = Q(pk__in=[])
+        for period in keys:
+            start, end = period_range(period)
+            q |= Q(created_at__gte=start, created_at__lt=end)
+    elif keys is not None:
+        q = Q(**{f'{ROLLUPS[kind][1]}__in': keys})
+    counts = {}
+    for source in SOURCES:
+        heroes = source._base_manager.filter(q, is_active=True)
+        if kind == 'period':
+            heroes = heroes.annotate(period=TruncMonth('created_at', output_field=DateField()))
+        rows = heroes.values(ROLLUPS[kind][1], 'type').annotate(count=Count('pk'), last=Max('created_at')).order_by()
+        for row in rows:
+            values = counts.setdefault(row[ROLLUPS[kind][1]], dict.fromkeys(COUNT_FIELDS, 0))
+            if row['type'] in TYPE_FIELDS:
+                values[TYPE_FIELDS[row['type']]] += row['count']
+            values['total'] += row['count']
+            values['last_awarded_at'] = max(values['last_awarded_at'] or row['last'], row['last'])
+    return counts
+
+
+def store(kind, counts, keys=None):
+    """Write ``counts`` and delete the rows of ``keys`` (or all keys) left without heroes."""
+    model, field = ROLLUPS[kind]
+    rows = model._base_manager.all() if keys is None else model._base_manager.filter(**{f'{field}__in': keys})
+    rows.exclude(**{f'{field}__in': list(counts)}).delete()
+    model._base_manager.bulk_create(
+        [model(**{field: key}, **values) for key, values in counts.items()],
+        update_conflicts=True,
+        unique_fields=[model._meta.pk.name],
+        update_fields=COUNT_FIELDS,
+        batch_size=500,
+    )
+    model_stamp(model).bump_on_commit()
+
+
+def refresh(users=(), months=(), periods=()):
+    """Recount the rollup rows of the given users, months and periods."""
+    with transaction.atomic():
+        for kind, keys in (('user', users), ('month', months), ('period', periods)):
+            keys = [key for key in set(keys) if key is not None]
+            if keys:
+                store(kind, count(kind, keys), keys)
+
+
+def refresh_heroes(heroes):
+    """Recount every rollup row the given heroes count towards."""
+    keys = [hero_keys(hero) for hero in heroes]
+    refresh(
+        users=[key['user'] for key in keys],
+        months=[key['month'] for key in keys],
+        periods=[key['period'] for key in keys],
+    )
+
+
+def rebuild():
+    """Recount every rollup table; return the number of rows per kind."""
+    with transaction.atomic():
+        result = {}
+        for kind in ROLLUPS:
+            counts = count(kind)
+            store(kind, counts)
+            result[kind] = len(counts)
+    return result
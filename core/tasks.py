@@ -0,0 +1,64 @@
+"""
+Background tasks run by ``manage.py run_worker`` (see ``core.jobs``).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from import_export.resources import modelresource_factory
+
+from . import prerender, search, warming
+from .jobs import report, task
+from .models import News
+
+# Rows between two progress reports of the row-by-row tasks.
+REPORT_EVERY = 50
+
+
+# Not retried: a second attempt would copy the articles again.
+@task(max_attempts=1)
+def duplicate_news(job, pks):
+    """Copy each article as "<title> (Copy)"."""
+    news = News.objects.filter(pk__in=pks).order_by('pk')
+    report(job, 0, total=len(pks))
+    copies = []
+    for done, item in enumerate(news.iterator(), 1):
+        item.pk = None
+        item.title = f"{item.title} (Copy)"
+        item.save()
+        copies.append(item.pk)
+        if done % REPORT_EVERY == 0:
+            report(job, done)
+    return {'created': copies}
+
+
+@task
+def export_objects(job, model, pks, file_format='csv'):
+    """Export the rows ``pks`` of ``model`` with import-export and store the file."""
+    model = apps.get_model(model)
+    report(job, 0, total=len(pks), message="Exporting")
+    queryset = model._base_manager.filter(pk__in=pks).order_by('pk')
+    dataset = modelresource_factory(model)().export(queryset=queryset)
+    content = dataset.export(file_format)
+    if isinstance(content, str):
+        content = content.encode()
+    name = f'{settings.JOB_EXPORT_DIR}/{model._meta.model_name}-{job.pk}.{file_format}'
+    path = default_storage.save(name, ContentFile(content))
+    return {'file': default_storage.url(path), 'rows': len(dataset)}
+
+
+@task(max_attempts=1)
+def rebuild_user_search(job, batch_size=2000):
+    total = search.rebuild_index(batch_size, progress=lambda done, total: report(job, done, total=total))
+    return {'users': total}
+
+
+@task(max_attempts=1)
+def warm_api_cache(job):
+    return {'rendered': warming.warm() or 0}
+
+
+@task(max_attempts=1)
+def prerender_api(job, full=False):
+    result = prerender.build(full=full)
+    return {'written': result.written, 'unchanged': result.unchanged}
@@ -0,0 +1,23 @@
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+
+from core.changelist import RollupChangeList
+
+register = template.Library()
+
+
+def rollup_date_hierarchy(cl):
+    """Django's date hierarchy, answered from the cached date rollup."""
+    return date_hierarchy(RollupChangeList(cl))
+
+
+@register.tag(name='rollup_date_hierarchy')
+def rollup_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=rollup_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
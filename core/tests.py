@@ -1,3 +1,1364 @@
-from django.test import TestCase
+import asyncio
+import functools
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import msgpack
+import orjson
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from . import archive, cdn, events, fragments, jobs, prerender, refdata, search, stats, sync, tasks, throttling, warming
+from .cache import model_stamp, single_flight
+from .filters import MonthHeroFilter, MentorFilter, NewsFilter
+from .html import sanitize_html
+from .middleware import ENCODERS
+from .admin import MonthHeroAdmin
+from .models import (
+    ArchivedMonthHero, ArchivedNews, Month, MonthHero, Mentor, Direction, News, Job,
+    UserHeroStats, MonthHeroStats, HeroTimelineStats,
+)
+from .renderers import RawJSON
+from .serializers import MentorSerializer
+from .sse import event_stream
+from .views import MonthViewSet, MonthHeroViewSet, MentorViewSet, NewsViewSet, current_month_cache
+
+
+# Throttle buckets and cache stamps of the test run, kept out of the repo's
+# var/, which a local development server also uses.
+TEST_VAR_DIR = tempfile.TemporaryDirectory(prefix='pdpj-tests-')
+
+
+@override_settings(
+    THROTTLE_STORE_PATH=os.path.join(TEST_VAR_DIR.name, 'throttle.sqlite3'),
+    CACHE_STAMP_DIR=os.path.join(TEST_VAR_DIR.name, 'stamps'),
+)
+class APITestCase(TestCase):
+    """Base class with a small fixture shared by the API tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.month = Month.objects.create(name="January 2025", is_active=True)
+        cls.user = User.objects.create_user(username="john_doe", email="john@example.com")
+        cls.hero = MonthHero.objects.create(month=cls.month, user=cls.user, type='student')
+        cls.direction = Direction.objects.create(title="Backend")
+        cls.mentor = Mentor.objects.create(full_name="Jane Smith", direction=cls.direction)
+        cls.news = News.objects.create(title="Launch", content="<p>Hello</p>")
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        current_month_cache.stamp.bump()
+        for table in refdata.TABLES.values():
+            table.stamp.bump()
+            table.all()
+
+
+class RendererTests(APITestCase):
+
+    def test_json_is_default(self):
+        response = self.client.get('/api/months/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = orjson.loads(response.content)
+        self.assertEqual(data['results'][0]['heroes'][0]['user']['username'], 'john_doe')
+
+    def test_msgpack_negotiation(self):
+        response = self.client.get('/api/months/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['results'][0]['name'], "January 2025")
+
+    def test_fragments_with_stock_and_browsable_renderers(self):
+        expected = self.client.get('/api/mentors/').json()
+        with mock.patch.object(MentorViewSet, 'renderer_classes', [JSONRenderer, BrowsableAPIRenderer]):
+            html = self.client.get('/api/mentors/', {'format': 'api'}).content.decode()
+            self.assertIn('&quot;full_name&quot;', html)
+            self.assertNotIn('\\&quot;', html)
+            response = self.client.get('/api/mentors/')
+            self.assertEqual(response.json(), expected)
+        body = JSONRenderer().render({'results': [RawJSON(b'{"id":1}')]})
+        self.assertEqual(orjson.loads(body), {'results': [{'id': 1}]})
+
+    def test_browsable_api_disabled_in_production(self):
+        response = self.client.get('/api/months/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 406)
+
+
+class CompressionTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        News.objects.bulk_create(News(title=f"News {i}", content="<p>Lorem ipsum</p>" * 20) for i in range(5))
+
+    def test_brotli_preferred(self):
+        response = self.client.get('/api/news/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(orjson.loads(brotli.decompress(response.content))['count'], 6)
+
+    def test_gzip_and_identity(self):
+        response = self.client.get('/api/news/', HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(orjson.loads(gzip.decompress(response.content))['count'], 6)
+        response = self.client.get('/api/news/')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cached_variant_is_reused(self):
+        first = self.client.get('/api/news/', HTTP_ACCEPT_ENCODING='br')
+        with mock.patch.dict(ENCODERS, br=mock.Mock(side_effect=AssertionError)):
+            second = self.client.get('/api/news/', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(first.content, second.content)
+
+
+class PurgeRecorder:
+    """Local HTTP stand-in for the edge purge API; records received keys."""
+
+    def __init__(self):
+        recorded = self.keys = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                recorded.append(set(self.headers['Surrogate-Key'].split()))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/purge"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EdgeCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recorder = PurgeRecorder()
+        self.addCleanup(self.recorder.close)
+        self.addCleanup(cdn.reset_purger)
+        cdn.reset_purger()
+        settings_override = self.settings(
+            CDN_PURGER='core.cdn.HTTPPurger',
+            CDN_PURGER_OPTIONS={'url': self.recorder.url},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_list_and_detail_headers(self):
+        response = self.client.get('/api/months/')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age', response['Surrogate-Control'])
+        keys = response['Surrogate-Key'].split()
+        self.assertEqual(keys[:2], ['month:list', f'month:{self.month.pk}'])
+        self.assertIn(f'hero:{self.hero.pk}', keys)
+        self.assertIn(f'user:{self.user.pk}', keys)
+
+        response = self.client.get(f'/api/news/{self.news.pk}/')
+        self.assertEqual(response['Surrogate-Key'], f'news:{self.news.pk}')
+
+    def test_save_delete_and_bulk_update_purge(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hero.description = "Updated"
+            self.hero.save()
+        self.assertLessEqual({
+            f'hero:{self.hero.pk}', 'hero:list', f'month:{self.month.pk}', f'user:{self.user.pk}',
+        }, self.recorder.keys[-1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.filter(pk=self.news.pk).update(is_active=False)
+        self.assertEqual(self.recorder.keys[-1], {f'news:{self.news.pk}', 'news:list'})
+
+        mentor_pk = self.mentor.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.delete()
+        self.assertEqual(self.recorder.keys[-1], {
+            f'mentor:{mentor_pk}', 'mentor:list', f'direction:{self.direction.pk}',
+        })
+
+
+class CurrentMonthTests(APITestCase):
+
+    def test_grouped_active_heroes(self):
+        teacher = User.objects.create_user(username="teacher")
+        MonthHero.objects.create(month=self.month, user=teacher, type='teacher')
+        MonthHero.objects.create(month=self.month, user=teacher, type='student', is_active=False)
+        response = self.client.get('/api/months/current/')
+        self.assertEqual(response.status_code, 200)
+        heroes = response.json()['heroes']
+        self.assertEqual([h['user']['username'] for h in heroes['student']], ['john_doe'])
+        self.assertEqual([h['user']['username'] for h in heroes['teacher']], ['teacher'])
+
+    def test_served_from_cache_until_invalidated(self):
+        self.client.get('/api/months/current/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/months/current/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.month.heroes.update(is_active=False)
+        response = self.client.get('/api/months/current/')
+        self.assertEqual(response.json()['heroes']['student'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Month.objects.update(is_active=False)
+        self.assertEqual(self.client.get('/api/months/current/').status_code, 404)
+
+
+class SingleFlightTests(APITestCase):
+
+    def test_list_served_from_cache_until_change(self):
+        self.client.get('/api/heroes/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/heroes/')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertIn(f'hero:{self.hero.pk}', response['Surrogate-Key'].split())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "John"
+            self.user.save()
+        response = self.client.get('/api/heroes/')
+        self.assertEqual(response.json()['results'][0]['user']['first_name'], "John")
+
+    def test_stale_value_while_another_worker_recomputes(self):
+        compute = mock.Mock(return_value='fresh')
+        self.assertEqual(single_flight('sf-test', 1, compute), 'fresh')
+        cache.add('sf-test:lock', True)
+        self.assertEqual(single_flight('sf-test', 2, compute), 'fresh')
+        self.assertEqual(compute.call_count, 1)
+
+        cache.delete('sf-test:lock')
+        compute.return_value = 'newer'
+        self.assertEqual(single_flight('sf-test', 2, compute), 'newer')
+
+    def test_waits_for_winner_without_stale_value(self):
+        cache.add('sf-test:lock', True)
+        threading.Timer(0.1, cache.set, ('sf-test', (1, 'winner'))).start()
+        compute = mock.Mock()
+        self.assertEqual(single_flight('sf-test', 1, compute), 'winner')
+        compute.assert_not_called()
+
+
+class WarmingTests(APITestCase):
+
+    def test_warm_resource_fills_the_cache(self):
+        client = prerender.InternalClient('http://testserver')
+        self.assertEqual(warming.warm_resource(client, 'months', MonthViewSet), 3)
+        with self.assertNumQueries(0):
+            self.client.get('/api/months/')
+            self.client.get('/api/months/current/')
+            self.client.get(f'/api/months/{self.month.pk}/')
+
+    def test_one_warm_up_at_a_time(self):
+        with mock.patch.object(warming, 'enabled', True), warming._running:
+            self.assertIsNone(warming.warm())
+
+    def test_skipped_outside_servers_with_process_local_cache(self):
+        with mock.patch.object(warming, 'enabled', False), self.assertLogs('core.warming', 'WARNING'):
+            with self.assertNumQueries(0):
+                self.assertEqual(warming.warm(), 0)
+
+
+class FilterIndexTests(APITestCase):
+    """Every supported filter combination must be answered from an index."""
+
+    def assertUsesIndexes(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        for step in plan:
+            if step.startswith('SCAN core_'):
+                self.assertIn('USING', step, f"table scan in plan: {plan}")
+            self.assertNotIn('TEMP B-TREE', step, f"sort in plan: {plan}")
+        self.assertTrue(any('INDEX' in step for step in plan), plan)
+
+    def check_filters(self, filterset_class, viewset, combinations):
+        for params in combinations:
+            with self.subTest(params=params):
+                filterset = filterset_class(params, queryset=viewset.queryset)
+                self.assertTrue(filterset.is_valid(), filterset.errors)
+                self.assertUsesIndexes(filterset.qs)
+
+    def test_hero_filters(self):
+        month, user = str(self.month.pk), str(self.user.pk)
+        self.check_filters(MonthHeroFilter, MonthHeroViewSet, [
+            {},
+            {'month': month},
+            {'type': 'student'},
+            {'user': user},
+            {'month': month, 'type': 'teacher'},
+            {'month': month, 'user': user},
+            {'created_at_after': '2025-01-01', 'created_at_before': '2025-02-01'},
+            {'month': month, 'created_at_after': '2025-01-01'},
+        ])
+
+    def test_user_history(self):
+        for viewset in (MonthHeroViewSet.queryset, MonthHeroViewSet.archive_queryset):
+            with self.subTest(model=viewset.model):
+                self.assertUsesIndexes(viewset.filter(user_id=self.user.pk))
+
+    def test_mentor_filters(self):
+        self.check_filters(MentorFilter, MentorViewSet, [{}, {'direction': str(self.direction.pk)}])
+
+    def test_news_filters(self):
+        self.check_filters(NewsFilter, NewsViewSet, [
+            {},
+            {'created_at_after': '2025-01-01'},
+            {'created_at_after': '2025-01-01', 'created_at_before': '2025-02-01'},
+        ])
+
+    def test_filter_endpoint(self):
+        response = self.client.get('/api/heroes/', {'month': self.month.pk, 'type': 'teacher'})
+        self.assertEqual(response.json()['count'], 0)
+        response = self.client.get('/api/heroes/', {'month': self.month.pk, 'type': 'student'})
+        self.assertEqual(response.json()['count'], 1)
+
+
+class UserSearchTests(APITestCase):
+
+    def search(self, query):
+        return sorted(search.search_users(User.objects.all(), query).values_list('username', flat=True))
+
+    def test_prefix_and_substring_matches(self):
+        User.objects.create_user(username="jane", first_name="Jane", last_name="Doe", email="jane@pdp.uz")
+        self.assertEqual(self.search("jo"), ['john_doe'])
+        self.assertEqual(self.search("do"), ['jane', 'john_doe'])
+        self.assertEqual(self.search("Jane DOE"), ['jane'])
+        self.assertEqual(self.search("pdp"), ['jane'])
+        self.assertEqual(self.search("ohn"), ['john_doe'])
+        self.assertEqual(self.search("xyz"), [])
+        limited = search.search_users(User.objects.all(), "doe ja", limit=5)
+        self.assertEqual(list(limited.values_list('username', flat=True)), ['jane'])
+
+    def test_limit_applies_after_every_word(self):
+        for i in range(5):
+            User.objects.create_user(username=f"joa{i}")
+        User.objects.create_user(username="jsmith", first_name="John", last_name="Smith")
+        limited = search.search_users(User.objects.all(), "jo sm", limit=5)
+        self.assertEqual(list(limited.values_list('username', flat=True)), ['jsmith'])
+        # A word without prefix matches falls back to substring search, as without a limit.
+        limited = search.search_users(User.objects.all(), "jo mit", limit=5)
+        self.assertEqual(list(limited.values_list('username', flat=True)), ['jsmith'])
+
+    def test_reindexed_on_save(self):
+        self.user.last_name = "Smith"
+        self.user.save()
+        self.assertEqual(self.search("smi"), ['john_doe'])
+
+    def test_prefix_lookup_uses_index(self):
+        sql, params = search.prefix_matches('jo').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(any('user_search_term_idx' in step for step in plan), plan)
+
+    def test_admin_autocomplete(self):
+        admin = User.objects.create_superuser(username="admin", password="secret")
+        self.client.force_login(admin)
+        response = self.client.get('/admin/autocomplete/', {
+            'term': 'john', 'app_label': 'core', 'model_name': 'monthhero', 'field_name': 'user',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['text'] for r in response.json()['results']], ['john_doe'])
+
+
+class ScalableChangeListTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser(username="admin", password="secret"))
+        for i in range(4):
+            user = User.objects.create_user(username=f"teacher{i}")
+            MonthHero.objects.create(month=self.month, user=user, type='teacher')
+
+    def test_keyset_paging(self):
+        heroes = list(MonthHero.objects.order_by('-created_at', '-pk'))
+        with mock.patch.object(MonthHeroAdmin, 'list_per_page', 2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/admin/core/monthhero/')
+            cl = response.context['cl']
+            self.assertEqual(cl.result_list, heroes[:2])
+            self.assertIsNone(cl.paginator.previous_url)
+            self.assertFalse(any('OFFSET' in q['sql'] for q in queries.captured_queries))
+
+            cl = self.client.get('/admin/core/monthhero/' + cl.paginator.next_url).context['cl']
+            self.assertEqual(cl.result_list, heroes[2:4])
+            cl = self.client.get('/admin/core/monthhero/' + cl.paginator.next_url).context['cl']
+            self.assertEqual(cl.result_list, heroes[4:])
+            self.assertIsNone(cl.paginator.next_url)
+
+            cl = self.client.get('/admin/core/monthhero/' + cl.paginator.previous_url).context['cl']
+            self.assertEqual(cl.result_list, heroes[2:4])
+            self.assertEqual(self.client.get('/admin/core/monthhero/?after=bogus').status_code, 302)
+
+    @override_settings(ADMIN_COUNT_CAP=2)
+    def test_estimated_counts(self):
+        cl = self.client.get('/admin/core/monthhero/').context['cl']
+        self.assertEqual((cl.result_count, cl.result_count_exact), (5, True))
+        cl = self.client.get('/admin/core/monthhero/', {'type__exact': 'teacher'}).context['cl']
+        self.assertEqual((cl.result_count, cl.result_count_exact), (2, False))
+
+    def test_date_hierarchy_from_rollup(self):
+        self.assertEqual(self.client.get('/admin/core/monthhero/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/core/monthhero/')
+        self.assertContains(response, 'created_at__day=')
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in queries.captured_queries))
+
+    def test_other_changelists(self):
+        for url in ('/admin/core/news/', '/admin/core/mentor/', f'/admin/core/monthhero/?month__id__exact={self.month.pk}'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        response = self.client.get('/admin/auth/user/')
+        self.assertEqual(response.status_code, 200)
+        counts = {user.username: user.hero_count for user in response.context['cl'].result_list}
+        self.assertEqual((counts['john_doe'], counts['teacher3'], counts['admin']), (1, 1, None))
+
+
+class NewsSummaryTests(APITestCase):
+
+    def test_summary_computed_on_save(self):
+        news = News.objects.create(title="Release", content=(
+            '<p onclick="x()">Hello   <b>big</b> world</p><script>alert(1)</script>'
+            '<a href="javascript:alert(1)">bad</a> <a href="https://pdp.uz" target="_blank">good</a>'
+        ))
+        self.assertEqual(news.content_html, (
+            '<p>Hello <b>big</b> world</p><a>bad</a> '
+            '<a href="https://pdp.uz" target="_blank" rel="noopener noreferrer">good</a>'
+        ))
+        self.assertEqual(news.excerpt, "Hello big world bad good")
+        self.assertEqual(news.word_count, 5)
+
+        news.content = "<p>" + "word " * 100 + "</p>"
+        news.save(update_fields=['content'])
+        news.refresh_from_db()
+        self.assertEqual(news.word_count, 100)
+        self.assertLessEqual(len(news.excerpt), News.EXCERPT_LENGTH)
+        self.assertTrue(news.excerpt.endswith("word…"))
+
+    def test_content_after_void_or_self_closed_dropped_tags_is_kept(self):
+        self.assertEqual(
+            sanitize_html('<p>a</p><embed src="x.swf"><p>b</p><iframe src="x"/><p>c</p><script>x</script><p>d</p>'),
+            ('<p>a</p><p>b</p><p>c</p><p>d</p>', 'a b c d'),
+        )
+
+    def test_control_characters_do_not_hide_a_scheme(self):
+        news = News.objects.create(title="Links", content=(
+            '<a href="\x01javascript:alert(1)">a</a><a href="java\x00script:x">b</a>'
+            '<a href="\x7f java\tscript:x">c</a><img src=" /media/x.png">'
+        ))
+        self.assertEqual(news.content_html, '<a>a</a><a>b</a><a>c</a><img src=" /media/x.png">')
+
+    def test_bulk_update_recomputes_summary(self):
+        News.objects.filter(pk=self.news.pk).update(content="<h1>New</h1><p>body</p>")
+        self.news.refresh_from_db()
+        self.assertEqual((self.news.excerpt, self.news.word_count), ("New body", 2))
+
+    def test_list_ships_excerpt_and_detail_the_body(self):
+        item = self.client.get('/api/news/').json()['results'][0]
+        self.assertEqual(item['excerpt'], "Hello")
+        self.assertNotIn('content', item)
+        self.assertEqual(self.client.get('/api/news/?full=1').json()['results'][0]['content'], "<p>Hello</p>")
+        self.assertEqual(self.client.get(f'/api/news/{self.news.pk}/').json()['content'], "<p>Hello</p>")
+
+
+class ReferenceDataTests(APITestCase):
+
+    def test_lookups_served_from_memory(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.directions.get(self.direction.pk).title, "Backend")
+            self.assertIsNone(refdata.directions.get(None))
+            self.assertEqual([m.pk for m in refdata.months.active()], [self.month.pk])
+
+    def test_reloaded_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Direction.objects.filter(pk=self.direction.pk).update(title="Backend (Python)")
+        self.assertEqual(refdata.directions.get(self.direction.pk).title, "Backend (Python)")
+
+    def test_stamp_checked_once_per_request(self):
+        refdata.begin_request()
+        self.addCleanup(refdata.end_request)
+        refdata.months.all()
+        with mock.patch.object(refdata.months.stamp, 'get') as get:
+            refdata.months.get(self.month.pk)
+            refdata.months.all()
+        get.assert_not_called()
+
+    def test_serializers_skip_reference_queries(self):
+        with self.assertNumQueries(2):
+            heroes = self.client.get('/api/heroes/').json()['results']
+        self.assertEqual(heroes[0]['month_name'], "January 2025")
+        with self.assertNumQueries(2):
+            mentors = self.client.get('/api/mentors/').json()['results']
+        self.assertEqual(mentors[0]['direction_title'], "Backend")
+
+
+class FragmentCacheTests(APITestCase):
+
+    def get_heroes(self):
+        model_stamp(MonthHero).bump()
+        return self.client.get('/api/heroes/').json()['results']
+
+    def test_only_misses_are_serialized(self):
+        other = MonthHero.objects.create(month=self.month, user=User.objects.create_user("jane"), type='student')
+        self.get_heroes()
+        other.description = "Updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        with mock.patch.object(MonthHeroViewSet, 'serializer_class', wraps=MonthHeroViewSet.serializer_class) as serializer:
+            heroes = self.get_heroes()
+        serializer.assert_called_once()
+        self.assertEqual([hero.pk for hero in serializer.call_args.args[0]], [other.pk])
+        self.assertEqual([hero['id'] for hero in heroes], [other.pk, self.hero.pk])
+        self.assertEqual(heroes[0]['description'], "Updated")
+
+    def test_referenced_change_drops_dependent_fragments(self):
+        self.get_heroes()
+        self.assertIsNotNone(cache.get(fragments.caches_by_model[MonthHero].key(self.hero.pk)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.month.name = "February 2025"
+            self.month.save()
+        self.assertIsNone(cache.get(fragments.caches_by_model[MonthHero].key(self.hero.pk)))
+        self.assertEqual(self.get_heroes()[0]['month_name'], "February 2025")
+
+    def test_fragments_match_serializer_output(self):
+        response = self.client.get('/api/mentors/', HTTP_ACCEPT='application/msgpack')
+        expected = MentorSerializer(self.mentor, context={'request': response.wsgi_request}).data
+        self.assertEqual(msgpack.unpackb(response.content)['results'], [orjson.loads(orjson.dumps(expected))])
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Query and size budgets for the public endpoints and the admin pages.
+
+    Every page is measured at each of ``SCALES`` (months, directions and
+    news rows, each month with three heroes and each direction with three
+    mentors) with cold caches. The query count must stay within budget and
+    must not grow with the data: a serializer field or admin display method
+    that queries per row fails here.
+    """
+    SCALES = (1, 5, 20)
+    # path: (queries, response bytes); '{month}' etc. are the first objects.
+    API_BUDGETS = {
+        '/api/': (0, 500),
+        '/api/months/': (4, 12000),
+        '/api/months/current/': (2, 1000),
+        '/api/months/{month}/': (5, 1000),
+        '/api/months/?archive=1': (6, 16000),
+        '/api/heroes/': (2, 4000),
+        '/api/heroes/{hero}/': (1, 500),
+        '/api/heroes/?archive=1': (2, 4000),
+        '/api/users/{user}/heroes/': (1, 1000),
+        '/api/mentors/': (2, 5000),
+        '/api/mentors/{mentor}/': (1, 500),
+        '/api/directions/': (3, 16000),
+        '/api/directions/{direction}/': (2, 2000),
+        '/api/news/': (2, 5000),
+        '/api/news/{news}/': (1, 500),
+        '/api/news/?archive=1': (2, 5000),
+        '/api/stats/users/': (2, 3000),
+        '/api/stats/months/': (2, 2000),
+        '/api/stats/timeline/': (2, 1000),
+    }
+    # path: queries, including the session and user lookups.
+    ADMIN_BUDGETS = {
+        '/admin/core/month/': 7,
+        '/admin/core/month/{month}/change/': 7,
+        '/admin/core/monthhero/': 5,
+        '/admin/core/monthhero/{hero}/change/': 7,
+        '/admin/core/direction/': 7,
+        '/admin/core/direction/{direction}/change/': 4,
+        '/admin/core/mentor/': 7,
+        '/admin/core/mentor/{mentor}/change/': 4,
+        '/admin/core/news/': 5,
+        '/admin/core/news/{news}/change/': 3,
+        '/admin/auth/user/': 5,
+        '/admin/auth/user/{user}/change/': 7,
+        '/admin/auth/group/': 5,
+        '/admin/auth/group/{group}/change/': 5,
+        '/admin/core/job/': 6,
+        '/admin/core/job/{job}/change/': 5,
+        '/admin/core/archivednews/': 5,
+        '/admin/core/archivednews/{archived_news}/change/': 3,
+        '/admin/core/archivedmonthhero/': 5,
+        '/admin/core/archivedmonthhero/{archived_hero}/change/': 7,
+    }
+
+    def populate(self, count):
+        """Add rows until there are ``count`` months, directions and news (live and archived)."""
+        now = timezone.now()
+        for i in range(Month.objects.count(), count):
+            month = Month.objects.create(name=f"Month {i}")
+            for hero_type in ('student', 'teacher', 'student'):
+                user = User.objects.create_user(username=f"user{i}-{hero_type}-{User.objects.count()}")
+                MonthHero.objects.create(month=month, user=user, type=hero_type, is_active=True)
+        for month in Month.objects.filter(archived_heroes=None):
+            ArchivedMonthHero.objects.create(
+                month=month, user=User.objects.create_user(f"archived{month.pk}"), type='teacher',
+                created_at=now, updated_at=now,
+            )
+        for i in range(Direction.objects.count(), count):
+            direction = Direction.objects.create(title=f"Direction {i}")
+            Mentor.objects.bulk_create(
+                Mentor(full_name=f"Mentor {i}-{j}", direction=direction, bio="Bio " * 50) for j in range(3)
+            )
+        News.objects.bulk_create(
+            News(title=f"News {i}", content="<p>Lorem ipsum</p>" * 50, excerpt="Lorem ipsum " * 20)
+            for i in range(News.objects.count(), count)
+        )
+        ArchivedNews.objects.bulk_create(
+            ArchivedNews(title=f"Old news {i}", content="<p>Lorem</p>", created_at=now, updated_at=now)
+            for i in range(ArchivedNews.objects.count(), count)
+        )
+
+    def measure(self, path):
+        # Warm process-wide lookups (content types, templates) first.
+        self.client.get(path)
+        cache.clear()
+        for model in (Month, MonthHero, Mentor, Direction, News, User):
+            model_stamp(model).bump()
+        current_month_cache.stamp.bump()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return queries.captured_queries, len(response.content)
+
+    def check_budgets(self, budgets):
+        admin = User.objects.create_superuser(username="admin", password="secret")
+        group = Group.objects.create(name="Editors")
+        group.user_set.add(admin)
+        objects = {
+            'month': self.month.pk, 'hero': self.hero.pk, 'mentor': self.mentor.pk,
+            'direction': self.direction.pk, 'news': self.news.pk, 'user': self.user.pk, 'group': group.pk,
+            'job': jobs.enqueue(tasks.warm_api_cache, user=admin).pk,
+            'archived_news': ArchivedNews.objects.create(
+                title="Archived", created_at=timezone.now(), updated_at=timezone.now(),
+            ).pk,
+            'archived_hero': ArchivedMonthHero.objects.create(
+                month=self.month, user=User.objects.create_user("archived"), type='teacher',
+                created_at=timezone.now(), updated_at=timezone.now(),
+            ).pk,
+        }
+        self.client.force_login(admin)
+        baseline = {}
+        for scale in self.SCALES:
+            self.populate(scale)
+            for template, budget in budgets.items():
+                path = template.format(**objects)
+                queries, size = self.measure(path)
+                max_queries, max_size = budget if isinstance(budget, tuple) else (budget, None)
+                sql = '\n'.join(query['sql'] for query in queries)
+                with self.subTest(path=path, scale=scale):
+                    self.assertLessEqual(len(queries), max_queries, f"over query budget:\n{sql}")
+                    self.assertEqual(len(queries), baseline.setdefault(path, len(queries)), f"queries grow with data:\n{sql}")
+                    if max_size is not None:
+                        self.assertLessEqual(size, max_size, "over size budget")
+
+    def test_api_budgets(self):
+        self.check_budgets(self.API_BUDGETS)
+
+    def test_admin_budgets(self):
+        self.check_budgets(self.ADMIN_BUDGETS)
+
+
+class JobQueueTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="admin", password="secret")
+
+    def register(self, func, **kwargs):
+        func = jobs.task(name=f'test_{func.__name__}', **kwargs)(func)
+        self.addCleanup(jobs.TASKS.pop, func.task_name)
+        return func
+
+    def test_duplicate_action_runs_in_worker(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/core/news/', {
+            'action': 'duplicate_news', '_selected_action': [self.news.pk],
+        }, follow=True)
+        job = Job.objects.get()
+        self.assertContains(response, f'/admin/core/job/{job.pk}/change/')
+        self.assertEqual(News.objects.count(), 1)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total, job.created_by), (Job.DONE, 1, 1, self.admin))
+        self.assertEqual(News.objects.get(pk=job.result['created'][0]).title, "Launch (Copy)")
+        self.assertEqual(self.client.get(f'/admin/core/job/{job.pk}/change/').status_code, 200)
+
+    @override_settings(JOB_RETRY_DELAY=60)
+    def test_retried_with_backoff_then_failed(self):
+        failing = self.register(mock.Mock(side_effect=ValueError("boom"), __name__='failing'), max_attempts=2)
+        job = jobs.enqueue(failing)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertIn("ValueError: boom", job.error)
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(failing.call_count, 2)
+
+    def test_expired_lease_taken_over(self):
+        def slow(job):
+            jobs.report(job, 1, total=2)
+        slow = self.register(slow)
+        jobs.enqueue(slow)
+        stale = jobs.claim('worker-a')
+        self.assertIsNone(jobs.claim('worker-b'))
+
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        job = jobs.claim('worker-b')
+        self.assertEqual((job.pk, job.attempts, job.worker), (stale.pk, 2, 'worker-b'))
+        with self.assertRaises(jobs.JobAborted):
+            jobs.report(stale, 1)
+        jobs.run_job(stale)
+        jobs.run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), (Job.DONE, 2))
+
+    def test_export_writes_file(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with self.settings(MEDIA_ROOT=media_root):
+            job = jobs.enqueue(tasks.export_objects, model='core.News', pks=[self.news.pk])
+            jobs.run_pending()
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.DONE, job.error)
+            with open(os.path.join(media_root, settings.JOB_EXPORT_DIR, f'news-{job.pk}.csv')) as f:
+                self.assertIn("Launch", f.read())
+
+
+class ArchiveTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        long_ago = timezone.now() - timedelta(days=400)
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.filter(pk=self.news.pk).update(created_at=long_ago)
+            self.closed = Month.objects.create(name="March 2024")
+            Month.objects.filter(pk=self.closed.pk).update(created_at=long_ago)
+            self.old_hero = MonthHero.objects.create(month=self.closed, user=self.user, type='teacher')
+            self.assertEqual(archive.archive_history(), {'news': 1, 'heroes': 1})
+
+    def test_rows_moved_with_their_ids(self):
+        self.assertFalse(News.objects.exists())
+        self.assertEqual(list(MonthHero.objects.all()), [self.hero])
+        archived = ArchivedNews.objects.get(pk=self.news.pk)
+        self.assertEqual((archived.content_html, archived.created_at.year), ("<p>Hello</p>", self.news.created_at.year - 1))
+        self.assertEqual(ArchivedMonthHero.objects.get(pk=self.old_hero.pk).month, self.closed)
+        self.assertEqual(self.client.get('/api/news/', {'since': '0'}).json()['deleted'], [self.news.pk])
+
+    def test_details_fall_back_to_archive(self):
+        self.assertEqual(self.client.get(f'/api/news/{self.news.pk}/').json()['title'], "Launch")
+        self.assertEqual(self.client.get(f'/api/heroes/{self.old_hero.pk}/').json()['month_name'], "March 2024")
+        heroes = self.client.get(f'/api/months/{self.closed.pk}/').json()['heroes']
+        self.assertEqual([hero['id'] for hero in heroes], [self.old_hero.pk])
+        self.assertEqual(self.client.get('/api/news/999/').status_code, 404)
+
+    def test_lists_only_show_archive_on_request(self):
+        self.assertEqual(self.client.get('/api/news/').json()['count'], 0)
+        self.assertEqual([n['id'] for n in self.client.get('/api/news/?archive=1').json()['results']], [self.news.pk])
+        response = self.client.get('/api/heroes/', {'archive': '1', 'month': self.closed.pk})
+        self.assertEqual([hero['id'] for hero in response.json()['results']], [self.old_hero.pk])
+        months = {m['id']: m['heroes'] for m in self.client.get('/api/months/').json()['results']}
+        self.assertEqual(months[self.closed.pk], [])
+
+    def test_admin_hides_and_restores(self):
+        self.client.force_login(User.objects.create_superuser(username="admin", password="secret"))
+        for url in ('/admin/core/archivednews/', '/admin/core/archivedmonthhero/'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.assertEqual(self.client.get('/api/news/?archive=1').json()['count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchivedNews.objects.filter(pk=self.news.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/news/?archive=1').json()['count'], 0)
+
+        awarded = timezone.now() - timedelta(days=500)
+        ArchivedMonthHero._base_manager.filter(pk=self.old_hero.pk).update(created_at=awarded)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/core/archivedmonthhero/', {
+                'action': 'restore_from_archive', '_selected_action': [self.old_hero.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ArchivedMonthHero.objects.exists())
+        restored = MonthHero.objects.get(pk=self.old_hero.pk)
+        self.assertEqual(restored.created_at, awarded)
+        since = sync.encode_token(self.old_hero.updated_at)
+        changed = self.client.get('/api/heroes/', {'since': since}).json()['changed']
+        self.assertIn(self.old_hero.pk, [hero['id'] for hero in changed])
+
+    def test_admin_restore_is_all_or_nothing(self):
+        self.client.force_login(User.objects.create_superuser(username="admin", password="secret"))
+        # Restored after old_hero, and clashes with the live self.hero.
+        now = timezone.now()
+        clash = ArchivedMonthHero.objects.create(
+            pk=9999, month=self.month, user=self.user, type=self.hero.type, created_at=now, updated_at=now,
+        )
+        restore = functools.partial(archive.restore, batch_size=1)
+        with mock.patch.object(archive, 'restore', restore):
+            response = self.client.post('/admin/core/archivedmonthhero/', {
+                'action': 'restore_from_archive', '_selected_action': [self.old_hero.pk, clash.pk],
+            }, follow=True)
+        self.assertContains(response, "nothing was restored")
+        self.assertEqual(ArchivedMonthHero.objects.count(), 2)
+        self.assertFalse(MonthHero.objects.filter(pk=self.old_hero.pk).exists())
+
+
+class ExportTests(APITestCase):
+
+    def read(self, response):
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [orjson.loads(line) for line in body.splitlines()]
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=2)
+    def test_streams_listing_in_id_order(self):
+        News.objects.bulk_create(News(title=f"News {i}", content="<p>x</p>", is_active=i != 2) for i in range(5))
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.read(self.client.get('/api/news/export/'))
+        expected = list(News.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        self.assertEqual([row['id'] for row in rows], expected)
+        self.assertIn('content', rows[0])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_resume_after_cursor_with_filters(self):
+        other = MonthHero.objects.create(month=self.month, user=User.objects.create_user("jane"), type='teacher')
+        rows = self.read(self.client.get('/api/heroes/export/', {'after': self.hero.pk}))
+        self.assertEqual([row['id'] for row in rows], [other.pk])
+        self.assertEqual(rows[0]['month_name'], "January 2025")
+        rows = self.read(self.client.get('/api/heroes/export/', {'type': 'student'}))
+        self.assertEqual([row['id'] for row in rows], [self.hero.pk])
+
+    def test_gzip_and_errors(self):
+        response = self.client.get('/api/months/export/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(self.read(response)[0]['heroes'][0]['id'], self.hero.pk)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+        response = self.client.get('/api/news/export/', {'after': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(orjson.loads(response.content), {'after': "Expected the id of the last exported object."})
+
+
+class BatchRetrievalTests(APITestCase):
+
+    def test_ids_in_requested_order(self):
+        second = News.objects.create(title="Second", content="...")
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/news/', {'ids': f'{second.pk},{self.news.pk},999'})
+        data = response.json()
+        self.assertEqual([item['id'] for item in data['results']], [second.pk, self.news.pk])
+        self.assertEqual(data['missing'], [999])
+
+    def test_nested_prefetch(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/months/', {'ids': str(self.month.pk)})
+        self.assertEqual(len(response.json()['results'][0]['heroes']), 1)
+
+    def test_invalid_and_oversized_batches(self):
+        self.assertEqual(self.client.get('/api/heroes/', {'ids': '1,x'}).status_code, 400)
+        ids = ','.join(str(pk) for pk in range(1, 52))
+        self.assertEqual(self.client.get('/api/heroes/', {'ids': ids}).status_code, 400)
+
+
+class BatchRequestTests(APITestCase):
+
+    def batch(self, *paths, **extra):
+        return self.client.get('/api/batch/', {'path': list(paths)}, **extra)
+
+    def test_responses_keyed_by_path(self):
+        paths = ['/api/directions/', f'/api/mentors/{self.mentor.pk}/', f'/api/months/{self.month.pk}/']
+        response = self.batch(*paths, HTTP_ACCEPT_ENCODING='identity')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data), paths)
+        self.assertTrue(all(entry['status'] == 200 for entry in data.values()))
+        self.assertEqual(data[paths[1]]['body']['id'], self.mentor.pk)
+        self.assertEqual(data[paths[2]]['body'], self.client.get(paths[2]).json())
+        keys = response[settings.CDN_SURROGATE_KEY_HEADER].split()
+        self.assertIn(f'mentor:{self.mentor.pk}', keys)
+        self.assertIn(f'month:{self.month.pk}', keys)
+
+    def test_errors_per_path(self):
+        data = self.batch('/api/news/999/', '/api/nope/', '/api/batch/', '/api/news/export/').json()
+        self.assertEqual([entry['status'] for entry in data.values()], [404, 404, 400, 400])
+        self.assertEqual(data['/api/news/999/']['body'], self.client.get('/api/news/999/').json())
+        response = self.batch('/api/news/999/')
+        self.assertNotIn(settings.CDN_SURROGATE_KEY_HEADER, response)
+
+    def test_not_edge_cached_when_keys_do_not_fit(self):
+        paths = ['/api/directions/', f'/api/months/{self.month.pk}/']
+        with self.settings(CDN_SURROGATE_KEY_MAX_LENGTH=10):
+            response = self.batch(*paths)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.CDN_SURROGATE_KEY_HEADER, response)
+        self.assertNotIn('Surrogate-Control', response)
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_sub_requests_keep_client_address(self):
+        with mock.patch('core.views.DirectionViewSet.list', autospec=True) as view:
+            view.side_effect = lambda viewset, request, *args, **kwargs: Response({
+                'addr': request.META['REMOTE_ADDR'], 'secure': request.is_secure(), 'query': request.GET.get('q'),
+            })
+            body = self.batch('/api/directions/?q=1', REMOTE_ADDR='10.0.0.9', secure=True).json()['/api/directions/?q=1']['body']
+        self.assertEqual(body, {'addr': '10.0.0.9', 'secure': True, 'query': '1'})
+
+    def test_limits(self):
+        self.assertEqual(self.client.get('/api/batch/').status_code, 400)
+        self.assertEqual(self.batch('https://example.com/api/news/').status_code, 400)
+        self.assertEqual(self.batch('/admin/').status_code, 400)
+        paths = [f'/api/news/{pk}/' for pk in range(settings.API_BATCH_PATHS_MAX + 1)]
+        self.assertEqual(self.batch(*paths).status_code, 400)
+        with self.settings(API_BATCH_MAX_BYTES=10):
+            data = self.batch('/api/news/', '/api/directions/').json()
+        self.assertEqual(data['/api/news/']['status'], 200)
+        self.assertEqual(data['/api/directions/']['status'], 413)
+
+
+class NestedLimitTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(username="jane")
+        MonthHero.objects.create(month=self.month, user=self.user, type='teacher')
+        MonthHero.objects.create(month=self.month, user=other, type='student')
+        Mentor.objects.bulk_create(Mentor(full_name=f"Mentor {i}", direction=self.direction) for i in range(2))
+
+    @override_settings(API_NESTED_LIMIT=2)
+    def test_collections_are_capped_with_count_and_link(self):
+        month = self.client.get(f'/api/months/{self.month.pk}/').json()
+        self.assertEqual(len(month['heroes']), 2)
+        self.assertEqual(month['hero_count'], 3)
+        self.assertEqual(month['heroes_url'], f'http://testserver/api/heroes/?month={self.month.pk}')
+
+        direction = self.client.get('/api/directions/').json()['results'][0]
+        self.assertEqual([mentor['full_name'] for mentor in direction['mentors']], ["Jane Smith", "Mentor 0"])
+        self.assertEqual(direction['mentor_count'], 3)
+        self.assertEqual(direction['mentors_url'], f'http://testserver/api/mentors/?direction={self.direction.pk}')
+
+    def test_inactive_children_are_left_out(self):
+        MonthHero.objects.filter(user__username="jane").update(is_active=False)
+        Mentor.objects.filter(full_name="Mentor 0").update(is_active=False)
+        retired = User.objects.create_user(username="retired")
+        hero = MonthHero.objects.create(month=self.month, user=retired, type='student', is_active=False)
+        archive.move(MonthHero.objects.filter(pk=hero.pk))
+        # Details merge in the archived heroes; the inactive one stays out.
+        month = self.client.get(f'/api/months/{self.month.pk}/').json()
+        self.assertEqual((len(month['heroes']), month['hero_count']), (2, 2))
+        direction = self.client.get('/api/directions/').json()['results'][0]
+        self.assertEqual([mentor['full_name'] for mentor in direction['mentors']], ["Jane Smith", "Mentor 1"])
+        self.assertEqual(direction['mentor_count'], 2)
+
+    @override_settings(API_NESTED_LIMIT=2)
+    def test_one_window_query_per_collection(self):
+        months = Month.objects.bulk_create(Month(name=f"Month {i}") for i in range(3))
+        MonthHero.objects.bulk_create(
+            MonthHero(month=month, user=self.user, type=hero_type)
+            for month in months for hero_type in ('student', 'teacher')
+        )
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get('/api/months/').json()['results']
+        self.assertEqual(len(queries), 3)
+        self.assertIn('ROW_NUMBER()', queries[-1]['sql'])
+        self.assertEqual([len(month['heroes']) for month in results], [2, 2, 2, 2])
+        self.assertEqual([month['hero_count'] for month in results], [2, 2, 2, 3])
+
+
+class StatsTests(APITestCase):
+
+    def rollups(self):
+        return {
+            kind: {
+                getattr(row, field): {name: getattr(row, name) for name in stats.COUNT_FIELDS}
+                for row in model.objects.all()
+            }
+            for kind, (model, field) in stats.ROLLUPS.items()
+        }
+
+    def assertRollupsCurrent(self):
+        self.assertEqual(self.rollups(), {kind: stats.count(kind) for kind in stats.ROLLUPS})
+
+    def test_rollups_follow_hero_changes(self):
+        other = User.objects.create_user(username="jane")
+        teacher = MonthHero.objects.create(month=self.month, user=self.user, type='teacher')
+        hero = MonthHero.objects.create(month=self.month, user=other, type='student')
+        ArchivedMonthHero.objects.create(
+            month=self.month, user=other, type='student', created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        self.assertEqual(UserHeroStats.objects.get(user=self.user).teachers, 1)
+        self.assertEqual(MonthHeroStats.objects.get(month=self.month).total, 4)
+        self.assertRollupsCurrent()
+
+        later = Month.objects.create(name="February 2025")
+        hero.month = later
+        hero.save()
+        MonthHero.objects.filter(pk=teacher.pk).update(is_active=False)
+        self.assertEqual(MonthHeroStats.objects.get(month=self.month).total, 2)
+        self.assertEqual(MonthHeroStats.objects.get(month=later).total, 1)
+        self.assertRollupsCurrent()
+
+        MonthHero.objects.filter(pk=hero.pk).update(month=self.month)
+        self.hero.delete()
+        self.assertFalse(MonthHeroStats.objects.filter(month=later).exists())
+        self.assertFalse(UserHeroStats.objects.filter(user=self.user).exists())
+        self.assertRollupsCurrent()
+
+    def test_rebuild(self):
+        UserHeroStats.objects.all().delete()
+        HeroTimelineStats.objects.create(period=date(2000, 1, 1), total=5, last_awarded_at=timezone.now())
+        self.assertEqual(stats.rebuild(), {'user': 1, 'month': 1, 'period': 1})
+        self.assertRollupsCurrent()
+
+    def test_endpoints(self):
+        other = User.objects.create_user(username="jane")
+        with self.captureOnCommitCallbacks(execute=True):
+            for month_name in ("February 2025", "March 2025"):
+                month = Month.objects.create(name=month_name)
+                MonthHero.objects.create(month=month, user=other, type='teacher')
+        with self.assertNumQueries(2):
+            users = self.client.get('/api/stats/users/').json()['results']
+        self.assertEqual([(row['user']['username'], row['total']) for row in users], [("jane", 2), ("john_doe", 1)])
+        users = self.client.get('/api/stats/users/', {'type': 'student'}).json()['results']
+        self.assertEqual([row['user']['username'] for row in users], ["john_doe"])
+        self.assertEqual(self.client.get('/api/stats/users/', {'type': 'x'}).status_code, 400)
+
+        months = self.client.get('/api/stats/months/').json()['results']
+        self.assertEqual(
+            [(row['month_name'], row['students'], row['teachers']) for row in months],
+            [("March 2025", 0, 1), ("February 2025", 0, 1), ("January 2025", 1, 0)],
+        )
+        timeline = self.client.get('/api/stats/timeline/').json()['results']
+        self.assertEqual(timeline, [{
+            'period': stats.period_of(timezone.now()).isoformat(), 'students': 1, 'teachers': 2, 'total': 3,
+            'last_awarded_at': timeline[0]['last_awarded_at'],
+        }])
+        self.assertIn('hero:list', self.client.get('/api/stats/timeline/')[settings.CDN_SURROGATE_KEY_HEADER])
+
+
+class UserHeroHistoryTests(APITestCase):
+
+    def test_history_newest_first(self):
+        url = f'/api/users/{self.user.pk}/heroes/'
+        with self.captureOnCommitCallbacks(execute=True):
+            later = Month.objects.create(name="February 2025")
+            newer = MonthHero.objects.create(month=later, user=self.user, type='teacher')
+            MonthHero.objects.create(month=later, user=self.user, type='student', is_active=False)
+            MonthHero.objects.create(month=later, user=User.objects.create_user("jane"), type='student')
+        refdata.months.all()
+        with self.assertNumQueries(1):
+            heroes = self.client.get(url).json()
+        self.assertEqual([hero['id'] for hero in heroes], [newer.pk, self.hero.pk])
+        self.assertEqual(heroes[0]['month_name'], "February 2025")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), heroes)
+        self.assertEqual(self.client.get(url, {'type': 'student'}).json()[0]['id'], self.hero.pk)
+
+    def test_archive_and_unknown_users(self):
+        now = timezone.now()
+        archived = ArchivedMonthHero.objects.create(
+            month=self.month, user=self.user, type='teacher', created_at=now, updated_at=now,
+        )
+        data = self.client.get(f'/api/users/{self.user.pk}/heroes/', {'archive': 1}).json()
+        self.assertEqual([hero['id'] for hero in data], [archived.pk])
+        jane = User.objects.create_user("jane")
+        self.assertEqual(self.client.get(f'/api/users/{jane.pk}/heroes/').json(), [])
+        self.assertEqual(self.client.get('/api/users/999/heroes/').status_code, 404)
+
+
+class DeltaSyncTests(APITestCase):
+
+    def sync(self, url, token):
+        response = self.client.get(url, {'since': token})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_and_empty_sync(self):
+        data = self.sync('/api/news/', '0')
+        self.assertEqual([item['id'] for item in data['changed']], [self.news.pk])
+        self.assertEqual(data['deleted'], [])
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=1)):
+            token = sync.next_token()
+        with self.assertNumQueries(1):
+            data = self.sync('/api/news/', token)
+        self.assertEqual(data, {'token': data['token'], 'changed': [], 'deleted': []})
+
+    def test_updates_deactivations_and_deletions(self):
+        token = sync.encode_token(timezone.now())
+        fresh = News.objects.create(title="Fresh", content="...")
+        News.objects.filter(pk=self.news.pk).update(is_active=False)
+        data = self.sync('/api/news/', token)
+        self.assertEqual([item['id'] for item in data['changed']], [fresh.pk])
+        self.assertEqual(data['deleted'], [self.news.pk])
+
+        token = sync.encode_token(timezone.now())
+        fresh_pk = fresh.pk
+        fresh.delete()
+        self.assertEqual(self.sync('/api/news/', token)['deleted'], [fresh_pk])
+
+    def test_deleted_stays_within_parent_and_filters(self):
+        other = User.objects.create_user(username="other")
+        others_hero = MonthHero.objects.create(month=self.month, user=other, type='teacher')
+        token = sync.encode_token(timezone.now())
+        MonthHero.objects.filter(pk__in=[self.hero.pk, others_hero.pk]).update(is_active=False)
+        data = self.sync(f'/api/users/{self.user.pk}/heroes/', token)
+        self.assertEqual((data['changed'], data['deleted']), ([], [self.hero.pk]))
+        data = self.client.get('/api/heroes/', {'since': token, 'type': 'teacher'}).json()
+        self.assertEqual(data['deleted'], [others_hero.pk])
+
+    def test_child_change_marks_parent(self):
+        token = sync.encode_token(timezone.now())
+        self.hero.description = "Updated"
+        self.hero.save()
+        data = self.sync('/api/months/', token)
+        self.assertEqual([item['id'] for item in data['changed']], [self.month.pk])
+
+    def test_parent_rename_marks_children(self):
+        token = sync.encode_token(timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.month.name = "Renamed"
+            self.month.save()
+            Direction.objects.filter(pk=self.direction.pk).update(title="Renamed")
+        heroes = self.sync('/api/heroes/', token)['changed']
+        self.assertEqual([(hero['id'], hero['month_name']) for hero in heroes], [(self.hero.pk, "Renamed")])
+        mentors = self.sync('/api/mentors/', token)['changed']
+        self.assertEqual([(mentor['id'], mentor['direction_title']) for mentor in mentors], [(self.mentor.pk, "Renamed")])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/news/', {'since': 'yesterday'}).status_code, 400)
+        for token in ('99999999999999999999', '-99999999999999999999', '253402300800000000'):
+            self.assertEqual(self.client.get('/api/news/', {'since': token}).status_code, 400, token)
+
+
+class EventStreamTests(APITestCase):
+
+    def test_model_signals_publish_events(self):
+        backend = mock.Mock()
+        with mock.patch.object(events, '_backend', backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                News.objects.filter(pk=self.news.pk).update(is_active=False)
+                self.hero.save()
+        published = [call.args[0] for call in backend.publish.call_args_list]
+        self.assertEqual(published, [
+            {'type': 'news.deactivated', 'topic': 'news', 'ids': [self.news.pk]},
+            {'type': 'hero.updated', 'topic': 'hero', 'ids': [self.hero.pk]},
+        ])
+
+    def test_stream_delivers_matching_events(self):
+        sent = []
+
+        async def scenario():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if b'news.created' in message.get('body', b''):
+                    disconnect.set()
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/stream/', 'query_string': b'topics=news'}
+            stream = asyncio.ensure_future(event_stream(scope, receive, send))
+            while not events.bus.subscribers:
+                await asyncio.sleep(0.01)
+            for event_type in ('hero.created', 'news.created'):
+                topic = event_type.split('.')[0]
+                event = {'type': event_type, 'topic': topic, 'ids': [1]}
+                threading.Thread(target=events.get_backend().publish, args=(event,)).start()
+            await asyncio.wait_for(stream, 2)
+
+        asyncio.run(scenario())
+        self.assertEqual(sent[0]['status'], 200)
+        bodies = b''.join(message.get('body', b'') for message in sent)
+        self.assertIn(b'event: news.created', bodies)
+        self.assertNotIn(b'hero.created', bodies)
+        self.assertFalse(events.bus.subscribers)
+
+    def test_slow_consumer_is_dropped(self):
+        async def scenario():
+            bus = events.EventBus(max_subscribers=1, queue_size=2, history_size=10)
+            subscriber = bus.subscribe()
+            self.assertIsNone(bus.subscribe())
+            for i in range(3):
+                bus.dispatch(i + 1, {'type': 'news.updated', 'topic': 'news', 'ids': [i]})
+            await asyncio.sleep(0)
+            return bus, subscriber
+
+        bus, subscriber = asyncio.run(scenario())
+        self.assertTrue(subscriber.dropped)
+        self.assertEqual(subscriber.queue.get_nowait(), events.CLOSED)
+        self.assertFalse(bus.subscribers)
+
+    def test_resume_far_behind_gets_resync(self):
+        async def scenario():
+            bus = events.EventBus(max_subscribers=3, queue_size=8, history_size=20)
+            backend = events.LocalBackend(bus)
+            for i in range(30):
+                backend.publish({'type': 'news.updated', 'topic': 'news', 'ids': [i]})
+            behind, recent, current = bus.subscribe(), bus.subscribe(), bus.subscribe()
+            bus.replay(behind, 5)
+            bus.replay(recent, 27)
+            bus.replay(current, 30)
+            await asyncio.sleep(0)
+            return behind, recent, current
+
+        behind, recent, current = asyncio.run(scenario())
+        self.assertFalse(behind.dropped)
+        self.assertEqual(behind.queue.get_nowait(), b'id: 30\nevent: resync\ndata: {"type":"resync"}\n\n')
+        self.assertTrue(behind.queue.empty())
+        self.assertEqual([recent.queue.get_nowait()[:6] for _ in range(3)], [b'id: 28', b'id: 29', b'id: 30'])
+        self.assertTrue(current.queue.empty())
+
+    def test_file_backend_shares_event_ids(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'events.log')
+        first = events.FileBackend(events.EventBus(1, 8, 8), path)
+        second = events.FileBackend(events.EventBus(1, 8, 8), path)
+        first.publish({'type': 'news.created', 'topic': 'news', 'ids': [1]})
+        second.publish({'type': 'news.updated', 'topic': 'news', 'ids': [1]})
+        with open(path, 'rb') as f:
+            self.assertEqual([orjson.loads(line)['id'] for line in f], [1, 2])
+        self.assertEqual(first.last_id(), 2)
+
+
+class PrerenderTests(APITestCase):
+
+    @override_settings(DEBUG=False, ALLOWED_HOSTS=['api.pdpjunior.uz'], PRERENDER_BASE_URL='https://api.pdpjunior.uz')
+    def test_benchmark_renderers_runs_with_production_hosts(self):
+        out = StringIO()
+        call_command('benchmark_renderers', iterations=1, stdout=out)
+        self.assertIn('msgpack', out.getvalue())
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = self.settings(PRERENDER_ROOT=self.root, PRERENDER_BASE_URL='http://testserver')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def read(self, relpath):
+        with open(os.path.join(self.root, relpath), 'rb') as f:
+            return orjson.loads(f.read())
+
+    def test_full_build(self):
+        prerender.build(full=True)
+        self.assertEqual(self.read('api/index.json')['news'], 'http://testserver/api/news/')
+        self.assertEqual(self.read('api/news/page-1.json')['count'], 1)
+        self.assertEqual(self.read(f'api/news/{self.news.pk}/index.json')['title'], "Launch")
+        self.assertEqual(self.read('api/months/current/index.json')['id'], self.month.pk)
+        with open(os.path.join(self.root, 'api/news/index.json.br'), 'rb') as f:
+            self.assertEqual(orjson.loads(brotli.decompress(f.read()))['count'], 1)
+
+    def test_incremental_build(self):
+        prerender.build(full=True)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=1)):
+            self.assertEqual(prerender.build().written, 0)
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=2)):
+            with self.captureOnCommitCallbacks(execute=True):
+                News.objects.filter(pk=self.news.pk).update(is_active=False)
+            result = prerender.build()
+        self.assertFalse(os.path.exists(os.path.join(self.root, f'api/news/{self.news.pk}')))
+        self.assertEqual(self.read('api/news/index.json')['count'], 0)
+        self.assertEqual(self.read('api/news/page-1.json')['count'], 0)
+        self.assertEqual(result.written, 2)
+
+
+class ThrottleTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        store = throttling.SQLiteBucketStore(os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3'))
+        patcher = mock.patch.object(throttling, '_store', store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(throttling.SharedTokenBucketThrottle.denied_until.clear)
+
+    def test_per_route_budget(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'news': '3/min'}
+        with mock.patch.object(api_settings, 'DEFAULT_THROTTLE_RATES', rates):
+            statuses = [self.client.get('/api/news/').status_code for _ in range(4)]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+            self.assertIn('Retry-After', self.client.get('/api/news/'))
+            # Other routes and other clients have their own buckets.
+            self.assertEqual(self.client.get(f'/api/news/{self.news.pk}/').status_code, 200)
+            self.assertEqual(self.client.get('/api/news/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_clients_behind_the_proxy_have_their_own_buckets(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'news': '2/min'}
+        with mock.patch.object(api_settings, 'DEFAULT_THROTTLE_RATES', rates):
+            # The proxy appends the address it saw; what the client sent before it is ignored.
+            statuses = [
+                self.client.get('/api/news/', HTTP_X_FORWARDED_FOR=f'1.2.3.4, 10.0.0.{i}').status_code
+                for i in (1, 1, 1, 2)
+            ]
+            self.assertEqual(statuses, [200, 200, 429, 200])
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'news': '2/min'}
+        with mock.patch.object(api_settings, 'DEFAULT_THROTTLE_RATES', rates), \
+                mock.patch.object(api_settings, 'NUM_PROXIES', 0):
+            statuses = [
+                self.client.get('/api/news/', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code for i in range(3)
+            ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_tests_keep_state_out_of_the_repo(self):
+        self.assertTrue(str(settings.THROTTLE_STORE_PATH).startswith(TEST_VAR_DIR.name))
+        self.assertTrue(model_stamp(News).path.startswith(TEST_VAR_DIR.name))
+
+    def test_batched_paths_are_throttled(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'news': '2/min'}
+        with mock.patch.object(api_settings, 'DEFAULT_THROTTLE_RATES', rates):
+            self.assertEqual(self.client.get('/api/news/').status_code, 200)
+            data = self.client.get('/api/batch/', {'path': ['/api/news/', '/api/news/?full=1']}).json()
+            self.assertEqual([entry['status'] for entry in data.values()], [200, 429])
+
+    def test_buckets_refill(self):
+        store = throttling.get_store()
+        self.assertEqual(store.take('k', 2, 1.0, 100.0), (True, 1.0))
+        self.assertEqual(store.take('k', 2, 1.0, 100.0), (True, 0.0))
+        self.assertEqual(store.take('k', 2, 1.0, 100.5), (False, 0.5))
+        self.assertEqual(store.take('k', 2, 1.0, 101.0), (True, 0.0))
+
+    def test_overhead(self):
+        store = throttling.get_store()
+        store.take('warmup', 10, 1.0, time.time())
+        start = time.perf_counter()
+        for i in range(1000):
+            store.take(f'client-{i % 50}', 1000, 10.0, time.time())
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
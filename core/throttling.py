@@ -0,0 +1,146 @@
+"""
+Cross-process rate limiting for the anonymous public API.
+
+Token buckets keyed by scope, client IP and route live in a small SQLite
+file shared by every worker. A check is one ``INSERT ... ON CONFLICT DO
+UPDATE ... RETURNING`` statement in WAL mode without fsync; once a client is
+denied, the worker remembers until when, so further requests from it are
+rejected without touching the store.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+TAKE_SQL = """
+INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = CASE
+        WHEN MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+        THEN MIN(:capacity, tokens + (:now - updated) * :rate) - 1
+        ELSE MIN(:capacity, tokens + (:now - updated) * :rate)
+    END,
+    allowed = MIN(:capacity, tokens + (:now - updated) * :rate) >= 1,
+    updated = :now
+RETURNING tokens, allowed
+"""
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, one connection per thread."""
+
+    # Buckets idle for this long are full again and can be forgotten.
+    PRUNE_AFTER = 60 * 60
+    PRUNE_EVERY = 10_000
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._calls = 0
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        """Try to take one token; return ``(allowed, tokens_left)``."""
+        conn = self.connection()
+        tokens, allowed = conn.execute(TAKE_SQL, {
+            'key': key, 'capacity': capacity, 'rate': rate, 'now': now,
+        }).fetchone()
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.PRUNE_AFTER,))
+        return bool(allowed), tokens
+
+    def clear(self):
+        self.connection().execute('DELETE FROM buckets')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteBucketStore(settings.THROTTLE_STORE_PATH)
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting == 'THROTTLE_STORE_PATH':
+        _store = None
+
+
+class SharedTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per (scope, client IP, route), shared across processes.
+
+    The scope is the view's ``throttle_scope`` (``'anon'`` if unset) and its
+    budget comes from ``DEFAULT_THROTTLE_RATES``: ``'240/min'`` allows bursts
+    of 240 requests refilled at 4 per second. In-process renders (pre-render,
+    cache warming) mark their requests with ``throttle_exempt``.
+    """
+    default_scope = 'anon'
+
+    # Process-local fast path: key -> time until which requests are denied.
+    denied_until = {}
+
+    def allow_request(self, request, view):
+        if getattr(request, 'throttle_exempt', False):
+            return True
+        scope = getattr(view, 'throttle_scope', None) or self.default_scope
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, duration = SimpleRateThrottle.parse_rate(None, rate)
+        match = request.resolver_match
+        route = match.view_name if match else request.path
+        key = f'{scope}:{self.get_ident(request)}:{route}'
+
+        now = time.time()
+        until = self.denied_until.get(key)
+        if until is not None:
+            if now < until:
+                self.wait_seconds = until - now
+                return False
+            self.denied_until.pop(key, None)
+
+        refill_rate = capacity / duration
+        try:
+            allowed, tokens = get_store().take(key, capacity, refill_rate, now)
+        except sqlite3.Error:
+            # Fail open: a busy or broken store must not take the API down.
+            return True
+        if allowed:
+            return True
+        self.wait_seconds = (1 - tokens) / refill_rate
+        if len(self.denied_until) > 100_000:
+            self.denied_until.clear()
+        self.denied_until[key] = now + self.wait_seconds
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
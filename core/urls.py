@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    MonthViewSet, MonthHeroViewSet,
-    MentorViewSet, DirectionViewSet, NewsViewSet, api_root
+    MonthViewSet, MonthHeroViewSet, UserHeroViewSet,
+    MentorViewSet, DirectionViewSet, NewsViewSet, api_batch, api_root,
+    UserStatsViewSet, MonthStatsViewSet, TimelineStatsViewSet, stats_root,
 )
 
 router = DefaultRouter()
@@ -11,8 +12,18 @@ router.register(r'heroes', MonthHeroViewSet, basename='hero')
 router.register(r'mentors', MentorViewSet, basename='mentor')
 router.register(r'directions', DirectionViewSet, basename='direction')
 router.register(r'news', NewsViewSet, basename='news')
+router.register(r'stats/users', UserStatsViewSet, basename='stats-user')
+router.register(r'stats/months', MonthStatsViewSet, basename='stats-month')
+router.register(r'stats/timeline', TimelineStatsViewSet, basename='stats-timeline')
 
 urlpatterns = [
     path('', api_root, name='api-root'),
+    path('batch/', api_batch, name='api-batch'),
+    path('stats/', stats_root, name='stats-root'),
+    path(
+        'users/<int:user_id>/heroes/',
+        UserHeroViewSet.as_view({'get': 'list'}, basename='user-hero'),
+        name='user-hero-list',
+    ),
     path('', include(router.urls)),
 ]
@@ -1,50 +1,420 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from rest_framework.reverse import reverse
 
-from .models import Month, MonthHero, Mentor, Direction, News
+from . import batch, cdn, export, fragments, stats, sync
+from .cache import ProcessCache, model_stamp, single_flight
+from .filters import (
+    ArchivedMonthHeroFilter, ArchivedNewsFilter, MonthHeroFilter, MentorFilter, NewsFilter
+)
+from .renderers import NDJSONRenderer
+from .models import (
+    ArchivedMonthHero, ArchivedNews, Month, MonthHero, Mentor, Direction, News,
+    UserHeroStats, MonthHeroStats, HeroTimelineStats,
+)
 from .serializers import (
-    MonthSerializer, MonthHeroSerializer,
-    MentorSerializer, DirectionSerializer, NewsSerializer
+    MonthSerializer, MonthHeroSerializer, CurrentMonthSerializer,
+    MentorSerializer, DirectionSerializer, NewsSerializer, NewsListSerializer,
+    UserHeroStatsSerializer, MonthHeroStatsSerializer, HeroTimelineStatsSerializer,
 )
 
+# Rendered ``/api/months/current/`` payloads, invalidated by core.receivers.
+current_month_cache = ProcessCache('current-month')
+
+
+def parse_ids(value, limit):
+    """Parse ``"3,1,2"`` into a de-duplicated list of ints, keeping order."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValidationError({'ids': "Expected a comma-separated list of integers."})
+    if not ids:
+        raise ValidationError({'ids': "At least one id is required."})
+    if len(ids) > limit:
+        raise ValidationError({'ids': f"At most {limit} ids can be requested at once."})
+    return ids
+
+
+def nested_prefetch(lookup, queryset):
+    """
+    Prefetch at most ``API_NESTED_LIMIT`` children per parent into the list
+    ``nested_<lookup>``; Django fetches a sliced prefetch with one
+    ``ROW_NUMBER()`` window query.
+    """
+    return Prefetch(lookup, queryset=queryset[:settings.API_NESTED_LIMIT], to_attr=f'nested_{lookup}')
+
+
+def child_count(queryset, field):
+    """Number of rows of ``queryset`` whose ``field`` points at the outer row."""
+    children = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(children.annotate(count=Count('pk')).values('count')), 0)
+
 
 class ReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     http_method_names = ['get']
+    # Models whose changes invalidate the cached responses of this viewset.
+    cache_dependencies = ()
+    # core.fragments.FragmentCache for the objects listed by this viewset.
+    fragment_cache = None
+    # Rows moved out of ``queryset`` by core.archive: served by id, and listed
+    # with ``?archive=1`` (filtered with ``archive_filterset_class``).
+    archive_queryset = None
+    archive_filterset_class = None
+    # Written to static files by core.prerender.
+    prerendered = True
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.list_by_ids(request)
+        if 'since' in request.query_params:
+            return self.list_changes(request)
+        return self.cached_response(request, self.list_page)
+
+    def list_page(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_many(page))
+        return Response(self.serialize_many(queryset))
+
+    def wants_archive(self):
+        return self.request.query_params.get('archive') in ('1', 'true')
+
+    def get_queryset(self):
+        if self.archived:
+            return self.scope(self.archive_queryset.all())
+        return self.scope(super().get_queryset())
+
+    def scope(self, queryset):
+        """Restrict ``queryset`` to the parent in the URL, for nested routes."""
+        return queryset
+
+    def serialize_many(self, objects):
+        """Representations of ``objects``, from ``fragment_cache`` when set."""
+        if self.fragment_cache is None or self.archived:
+            return self.get_serializer(objects, many=True).data
+        origin = f'{self.request.scheme}://{self.request.get_host()}'
+        return self.fragment_cache.render(
+            objects, lambda misses: self.get_serializer(misses, many=True).data, origin,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(ReadOnlyViewSet, self).retrieve(request, *args, **kwargs))
+
+    def cached_response(self, request, render):
+        """Serve from the shared cache; one worker re-renders a stale entry."""
+        url = f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+        key = f'api:{self.basename}:{hashlib.blake2b(url.encode(), digest_size=16).hexdigest()}'
+        version = tuple(model_stamp(model).get() for model in self.cache_dependencies)
+
+        def compute():
+            return render().data, self.surrogate_keys
+
+        data, self.surrogate_keys = single_flight(key, version, compute)
+        return Response(data)
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer])
+    def export(self, request):
+        """Every listed object as NDJSON in id order; resume with ``?after=<last id>``."""
+        after = export.parse_cursor(request.query_params.get('after'))
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__gt=after).order_by('pk')
+        lines = export.export_lines(queryset, lambda chunk: self.get_serializer(chunk, many=True).data)
+        return export.streaming_response(request._request, lines)
+
+    def list_by_ids(self, request):
+        """``?ids=3,1,2``: fetch specific objects in one query, in the requested order."""
+        ids = parse_ids(request.query_params['ids'], settings.API_BATCH_IDS_MAX)
+        found = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        objects = [found[pk] for pk in ids if pk in found]
+        self.tag_objects(objects, collection=True)
+        return Response({
+            'results': self.serialize_many(objects),
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    def list_changes(self, request):
+        """``?since=<token>``: objects changed and ids removed since the token."""
+        since = sync.decode_token(request.query_params['since'])
+        token = sync.next_token()
+        updated_pks, deleted_pks = sync.changes_since(self.queryset.model, since)
+        objects = []
+        if updated_pks:
+            objects = list(self.filter_queryset(self.get_queryset()).filter(updated_at__gt=since))
+            unlisted = updated_pks - {obj.pk for obj in objects}
+            if unlisted:
+                # Changed rows that still match the parent and filters but are no
+                # longer listed (e.g. deactivated); other rows were never the client's.
+                matching = self.filter_queryset(self.scope(self.queryset.model._base_manager.all()))
+                deleted_pks |= set(matching.filter(pk__in=unlisted).values_list('pk', flat=True))
+        self.tag_objects(objects, collection=True)
+        return Response({
+            'token': token,
+            'changed': self.serialize_many(objects),
+            'deleted': sorted(deleted_pks),
+        })
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.surrogate_keys = []
+        self.archived = (
+            self.archive_queryset is not None and self.action in ('list', 'export')
+            and 'since' not in request.query_params and self.wants_archive()
+        )
+        if self.archived:
+            self.filterset_class = self.archive_filterset_class
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        self.tag_objects(page if page is not None else queryset, collection=True)
+        return page
+
+    def get_object(self):
+        try:
+            obj = super().get_object()
+        except Http404:
+            if self.archive_queryset is None:
+                raise
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            obj = get_object_or_404(self.archive_queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            self.check_object_permissions(self.request, obj)
+        self.tag_objects([obj])
+        return obj
+
+    def tag_objects(self, objects, collection=False):
+        """Record surrogate keys for ``objects``: collection and top-level keys first."""
+        objects = list(objects)
+        if collection:
+            self.surrogate_keys.append(cdn.collection_key(self.queryset.model))
+        self.surrogate_keys.extend(cdn.object_key(type(obj), obj.pk) for obj in objects)
+        for obj in objects:
+            self.surrogate_keys.extend(sorted(cdn.surrogate_keys(obj)))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cdn.patch_cdn_headers(response, getattr(self, 'surrogate_keys', ()))
+        return response
 
 
 class MonthViewSet(ReadOnlyViewSet):
-    queryset = Month.objects.all().order_by('-created_at')
+    queryset = Month.objects.order_by('-created_at')
     serializer_class = MonthSerializer
+    throttle_scope = 'months'
+    cache_dependencies = (Month, MonthHero, User, ArchivedMonthHero)
+
+    def with_archived_heroes(self):
+        """Details and ``?archive=1`` lists include the heroes moved to the archive."""
+        return self.action == 'retrieve' or (self.action in ('list', 'export') and self.wants_archive())
+
+    def get_queryset(self):
+        # Only the active rows, as listed by heroes_url.
+        heroes = MonthHero.objects.filter(is_active=True).select_related('user').order_by('-created_at')
+        queryset = super().get_queryset().annotate(
+            hero_count=child_count(MonthHero.objects.filter(is_active=True), 'month'),
+        ).prefetch_related(nested_prefetch('heroes', heroes))
+        if self.with_archived_heroes():
+            archived = ArchivedMonthHero.objects.filter(is_active=True).select_related('user').order_by('-created_at')
+            queryset = queryset.annotate(
+                archived_hero_count=child_count(ArchivedMonthHero.objects.filter(is_active=True), 'month'),
+            ).prefetch_related(nested_prefetch('archived_heroes', archived))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['archived_heroes'] = self.with_archived_heroes()
+        return context
+
+    @action(detail=False)
+    def current(self, request):
+        """The active month with its active heroes grouped by type."""
+        key = (request.scheme, request.get_host())
+        cached = current_month_cache.get_or_set(key, lambda: self.render_current_month(request))
+        if cached is None:
+            raise Http404("No active month.")
+        data, self.surrogate_keys = cached
+        return Response(data)
+
+    def render_current_month(self, request):
+        month = Month.objects.filter(is_active=True).order_by('-created_at').prefetch_related(
+            Prefetch(
+                'heroes',
+                queryset=MonthHero.objects.filter(is_active=True).select_related('user').order_by('-created_at'),
+                to_attr='active_heroes',
+            )
+        ).first()
+        if month is None:
+            return None
+        keys = [cdn.collection_key(Month), cdn.object_key(Month, month.pk)]
+        keys.extend(cdn.object_key(MonthHero, hero.pk) for hero in month.active_heroes)
+        keys.extend(cdn.object_key(type(hero.user), hero.user_id) for hero in month.active_heroes)
+        data = CurrentMonthSerializer(month, context=self.get_serializer_context()).data
+        return data, keys
 
 
 class MonthHeroViewSet(ReadOnlyViewSet):
-    queryset = MonthHero.objects.filter(is_active=True).order_by('-created_at')
+    queryset = MonthHero.objects.filter(is_active=True).select_related('user').order_by('-created_at')
     serializer_class = MonthHeroSerializer
+    throttle_scope = 'heroes'
+    cache_dependencies = (MonthHero, Month, User, ArchivedMonthHero)
+    fragment_cache = fragments.register(MonthHero)
+    filterset_class = MonthHeroFilter
+    archive_queryset = ArchivedMonthHero.objects.filter(is_active=True).select_related('user').order_by('-created_at')
+    archive_filterset_class = ArchivedMonthHeroFilter
+
+
+class UserHeroViewSet(MonthHeroViewSet):
+    """
+    ``/api/users/{user_id}/heroes/``: every award of one user, newest first,
+    unpaginated. One query on ``hero_user_idx`` (``hero_archive_user_idx``
+    with ``?archive=1``); month names come from ``core.refdata``.
+    """
+    pagination_class = None
+
+    def scope(self, queryset):
+        return queryset.filter(user_id=self.kwargs['user_id'])
+
+    def list_page(self):
+        response = super().list_page()
+        if not response.data and not User.objects.filter(pk=self.kwargs['user_id']).exists():
+            raise Http404("No such user.")
+        return response
 
 
 class MentorViewSet(ReadOnlyViewSet):
     queryset = Mentor.objects.filter(is_active=True).order_by('full_name')
     serializer_class = MentorSerializer
+    throttle_scope = 'mentors'
+    cache_dependencies = (Mentor, Direction)
+    fragment_cache = fragments.register(Mentor)
+    filterset_class = MentorFilter
 
 
 class DirectionViewSet(ReadOnlyViewSet):
     queryset = Direction.objects.filter(is_active=True).order_by('title')
     serializer_class = DirectionSerializer
+    throttle_scope = 'directions'
+    cache_dependencies = (Direction, Mentor)
+
+    def get_queryset(self):
+        return super().get_queryset().annotate(
+            mentor_count=child_count(Mentor.objects.filter(is_active=True), 'direction'),
+        ).prefetch_related(nested_prefetch('mentors', Mentor.objects.filter(is_active=True).order_by('full_name')))
 
 
 class NewsViewSet(ReadOnlyViewSet):
     queryset = News.objects.filter(is_active=True).order_by('-created_at')
     serializer_class = NewsSerializer
+    throttle_scope = 'news'
+    cache_dependencies = (News, ArchivedNews)
+    filterset_class = NewsFilter
+    archive_queryset = ArchivedNews.objects.filter(is_active=True).order_by('-created_at')
+    archive_filterset_class = ArchivedNewsFilter
+
+    def full_list(self):
+        """``?full=1`` lists news with their HTML body instead of the excerpt."""
+        return self.request.query_params.get('full') in ('1', 'true')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and not self.full_list():
+            queryset = queryset.defer('content', 'content_html')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self.full_list():
+            return NewsListSerializer
+        return NewsSerializer
+
+
+class StatsViewSet(ReadOnlyViewSet):
+    """Hero statistics read from the rollup tables of ``core.stats``."""
+    throttle_scope = 'stats'
+    # Rollup rows have no change tracking: no ?since=, export or prerendering.
+    export = None
+    prerendered = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.list_page)
+
+    def tag_objects(self, objects, collection=False):
+        # Any hero change may move the figures: purge with the hero list.
+        self.surrogate_keys.append(cdn.collection_key(MonthHero))
+
+
+class UserStatsViewSet(StatsViewSet):
+    """Leaderboard: users by number of heroes, or of one ``?type=``."""
+    queryset = UserHeroStats.objects.select_related('user')
+    serializer_class = UserHeroStatsSerializer
+    cache_dependencies = (UserHeroStats, User)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        hero_type = self.request.query_params.get('type')
+        if hero_type is None:
+            return queryset.order_by('-total', 'user_id')
+        if hero_type not in stats.TYPE_FIELDS:
+            raise ValidationError({'type': f"Expected one of: {', '.join(stats.TYPE_FIELDS)}."})
+        field = stats.TYPE_FIELDS[hero_type]
+        return queryset.filter(**{f'{field}__gt': 0}).order_by(f'-{field}', 'user_id')
+
+
+class MonthStatsViewSet(StatsViewSet):
+    queryset = MonthHeroStats.objects.order_by('-month__created_at')
+    serializer_class = MonthHeroStatsSerializer
+    cache_dependencies = (MonthHeroStats, Month)
+
+
+class TimelineStatsViewSet(StatsViewSet):
+    queryset = HeroTimelineStats.objects.order_by('period')
+    serializer_class = HeroTimelineStatsSerializer
+    cache_dependencies = (HeroTimelineStats,)
+
+
+@api_view(['GET'])
+def stats_root(request, format=None):
+    response = Response({
+        'users': reverse('stats-user-list', request=request, format=format),
+        'months': reverse('stats-month-list', request=request, format=format),
+        'timeline': reverse('stats-timeline-list', request=request, format=format),
+    })
+    return cdn.patch_cdn_headers(response)
 
 
 @api_view(['GET'])
 def api_root(request, format=None):
-    return Response({
+    response = Response({
         'months': reverse('month-list', request=request, format=format),
         'heroes': reverse('hero-list', request=request, format=format),
         'mentors': reverse('mentor-list', request=request, format=format),
         'directions': reverse('direction-list', request=request, format=format),
         'news': reverse('news-list', request=request, format=format),
+        'stats': reverse('stats-root', request=request, format=format),
+        'batch': reverse('api-batch', request=request, format=format),
     })
+    return cdn.patch_cdn_headers(response)
+
+
+@api_view(['GET'])
+def api_batch(request, format=None):
+    """Several API GETs in one request: ``?path=/api/directions/&path=/api/months/3/``."""
+    paths = batch.parse_paths(request.query_params.getlist('path'), settings.API_BATCH_PATHS_MAX)
+    results, keys = batch.execute(request._request, paths)
+    response = Response(results)
+    if all(result['status'] == 200 for result in results.values()):
+        if len(cdn.surrogate_key_value(keys)) <= settings.CDN_SURROGATE_KEY_MAX_LENGTH:
+            cdn.patch_cdn_headers(response, keys)
+        else:
+            # Truncated keys would leave some paths unpurged at the edge.
+            patch_cache_control(response, no_store=True)
+    return response
@@ -0,0 +1,145 @@
+"""
+Background warming of the API response cache.
+
+The hot set is the API root, the first ``WARM_PAGES`` pages of every list
+route, the extra list actions (``/api/months/current/``) and the details of
+up to ``WARM_MAX_DETAILS`` active objects per route. It is rendered in-process
+through the same views as live traffic, so entries land under the keys real
+requests look up (``WARM_BASE_URL`` must be the public scheme and host).
+
+Servers call ``start()`` from ``config.wsgi``/``config.asgi``: the first
+request of a process schedules a warm-up, and so does every committed change
+to a public model afterwards (debounced). Only ``WARM_CONCURRENCY`` threads
+render at a time and only one warm-up runs per process, so warming never
+competes with live traffic for more than a couple of threads.
+
+Warming from another process (``manage.py warm_cache``, the job worker) only
+helps if ``API_CACHE_ALIAS`` is a shared backend (Redis, Memcached,
+database). With a process-local one such as ``LocMemCache`` it is skipped.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.signals import request_started
+from django.db import connections, transaction
+
+from .prerender import EXTRA_PATHS, InternalClient
+
+logger = logging.getLogger(__name__)
+
+# Set by start(): this process serves requests and warms its caches.
+enabled = False
+
+_timer = None
+_timer_lock = threading.Lock()
+_running = threading.Lock()
+
+
+def warm_root(client):
+    client.render('/api/')
+    return 1
+
+
+def warm_resource(client, prefix, viewset):
+    """Render ``prefix``'s first pages, extra list actions and active details."""
+    rendered = 0
+    for page in range(1, settings.WARM_PAGES + 1):
+        status, body = client.render(f'/api/{prefix}/', {'page': page} if page > 1 else None)
+        rendered += 1
+        if status != 200 or orjson.loads(body).get('next') is None:
+            break
+    for name in EXTRA_PATHS.get(prefix, ()):
+        client.render(f'/api/{prefix}/{name}/')
+        rendered += 1
+    pks = viewset.queryset.values_list('pk', flat=True)[:settings.WARM_MAX_DETAILS]
+    for pk in pks:
+        client.render(f'/api/{prefix}/{pk}/')
+        rendered += 1
+    return rendered
+
+
+def _run(job, *args):
+    try:
+        return job(*args)
+    except Exception:
+        logger.exception("Cache warming step %s%r failed", job.__name__, args[1:])
+        return 0
+    finally:
+        connections.close_all()
+
+
+def cache_is_shared():
+    """Whether entries written to ``API_CACHE_ALIAS`` are seen by other processes."""
+    return not isinstance(caches[settings.API_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def warm():
+    """Render the hot set once; return the number of paths rendered, or None
+    if another warm-up is already running in this process."""
+    from .urls import router
+
+    if not enabled and not cache_is_shared():
+        logger.warning(
+            "Skipping cache warming: API_CACHE_ALIAS %r is local to this process, which serves no requests",
+            settings.API_CACHE_ALIAS,
+        )
+        return 0
+
+    if not _running.acquire(blocking=False):
+        return None
+    try:
+        client = InternalClient(settings.WARM_BASE_URL)
+        with ThreadPoolExecutor(settings.WARM_CONCURRENCY, thread_name_prefix='cache-warm') as pool:
+            futures = [pool.submit(_run, warm_root, client)]
+            futures.extend(
+                pool.submit(_run, warm_resource, client, prefix, viewset)
+                for prefix, viewset, basename in router.registry
+            )
+        return sum(future.result() for future in futures)
+    finally:
+        _running.release()
+
+
+def _run_scheduled_warm():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    if warm() is None:
+        # The running warm-up may have passed the changed routes already.
+        schedule_warm()
+
+
+def schedule_warm(delay=None):
+    """Debounced ``warm()`` in a background thread."""
+    global _timer
+    with _timer_lock:
+        if _timer is None:
+            _timer = threading.Timer(
+                settings.WARM_DEBOUNCE_SECONDS if delay is None else delay, _run_scheduled_warm,
+            )
+            _timer.daemon = True
+            _timer.start()
+
+
+def schedule_warm_on_commit():
+    if enabled:
+        transaction.on_commit(schedule_warm)
+
+
+def _warm_after_first_request(sender, **kwargs):
+    request_started.disconnect(_warm_after_first_request)
+    schedule_warm(delay=0)
+
+
+def start():
+    """Enable warming in a serving process; the first request triggers it."""
+    global enabled
+    if settings.WARM_ENABLED and not enabled:
+        enabled = True
+        request_started.connect(_warm_after_first_request)